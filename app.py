@@ -1,30 +1,35 @@
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import startup_profile
+startup_profile.start()
 
-from extrapolation_method.model import PolynomialExtrapolationModel
-
-from data_processing.preprocesing import process_data
-
-from app_logic import (
-    update_years,
-    on_submit,
-    display_statistics,
-    perform_column_normalization
-)
+import os
+import threading
 
 import tkinter as tk
+from tkinter import filedialog
 from tkinter import ttk
 
-data = process_data()
+import instrumentation
+
 
-model = PolynomialExtrapolationModel(data, x_future=2025)
+HEATMAP_EXTRA_COLUMNS = ['Area (Km²)', 'Density (per Km²)', 'Growth Rate', 'World Population Percentage']
+# Шлях до попередньо обчисленого сховища прогнозів (python -m extrapolation_method --store PATH)
+FORECAST_STORE_ENV = 'WORLD_POP_FORECAST_STORE'
+FORECAST_HORIZON = 2070
+DIAGNOSTICS_REFRESH_MS = 1000
 
-heatmap_columns = [col for col in model.df.columns if 'Population' in col and col != 'World Population Percentage']
-heatmap_columns.extend(['Area (Km²)', 'Density (per Km²)', 'Growth Rate', 'World Population Percentage'])
-heatmap_columns = [col for col in heatmap_columns if col in model.df.columns] # Фільтруємо наявні
 
+def launch_gui(model=None):
+    """
+    Builds the window and shows it immediately.
 
-def launch_gui(model):
+    The dataset and model (unless a model is passed in) are loaded on a background
+    thread; matplotlib and the GUI logic are imported right after the first paint.
+    Controls stay disabled until both are ready.
+    """
+    # Спільний стан: модель, модулі та осі з'являються після фонового завантаження
+    app = {'model': model}
+
+    startup_profile.mark('launch_gui')
     root = tk.Tk()
     root.title("Аналіз та Прогнозування Населення")
     root.geometry("1200x850")
@@ -63,31 +68,33 @@ def launch_gui(model):
     predict_controls_frame.pack(pady=5)
 
     tk.Label(predict_controls_frame, text="Оберіть країну:").grid(row=0, column=0, padx=5, pady=5, sticky='e')
-    country_var = tk.StringVar(value=model.test_country)
-    countries = sorted(model.df['Country/Territory'].unique().tolist())
-    country_menu = ttk.Combobox(predict_controls_frame, textvariable=country_var, values=countries, state='readonly', width=30)
+    country_var = tk.StringVar()
+    country_menu = ttk.Combobox(predict_controls_frame, textvariable=country_var, values=[], state='disabled', width=30)
     country_menu.grid(row=0, column=1, padx=5, pady=5, sticky='w')
 
     tk.Label(predict_controls_frame, text="Оберіть рік для прогнозу/перевірки:").grid(row=1, column=0, padx=5, pady=5, sticky='e')
-    year_var = tk.IntVar(value=model.test_year)
-    full_years = list(range(1970, 2071))
-    known_years = [1970, 1980, 1990, 2000, 2010, 2015, 2020, 2022]
+    year_var = tk.IntVar(value=2022)
+    # Роки заповнюються зі схеми датасету, коли модель завантажиться
+    full_years = []
+    known_years = []
     year_menu = ttk.Combobox(predict_controls_frame, textvariable=year_var, values=full_years, state='readonly', width=10)
     year_menu.grid(row=1, column=1, padx=5, pady=5, sticky='w')
 
     error_check_var = tk.BooleanVar()
-    error_check = tk.Checkbutton(predict_controls_frame, text="Перевірити наявний рік (для похибки)", variable=error_check_var, command=lambda: update_years(year_var, year_menu, full_years, known_years, error_check_var))
+    error_check = tk.Checkbutton(predict_controls_frame, text="Перевірити наявний рік (для похибки)", variable=error_check_var, state='disabled', command=lambda: app['app_logic'].update_years(year_var, year_menu, full_years, known_years, error_check_var))
     error_check.grid(row=2, column=1, sticky='w', padx=5, pady=5)
 
     normalize_plot_var = tk.BooleanVar()
     normalize_plot_check = tk.Checkbutton(predict_controls_frame, text="Нормалізувати дані на графіку", variable=normalize_plot_var)
     normalize_plot_check.grid(row=2, column=2, sticky='w', padx=5, pady=5)
 
-
-    update_years(year_var, year_menu, full_years, known_years, error_check_var)
+    tk.Label(predict_controls_frame, text="Метод екстраполяції:").grid(row=0, column=2, padx=5, pady=5, sticky='e')
+    method_var = tk.StringVar(value='polynomial')
+    method_menu = ttk.Combobox(predict_controls_frame, textvariable=method_var, values=[], state='disabled', width=15)
+    method_menu.grid(row=0, column=3, padx=5, pady=5, sticky='w')
 
 
-    predict_button = tk.Button(predict_controls_frame, text="Прогнозувати", command=lambda: on_submit(country_var, year_var, error_check_var, normalize_plot_var, model, output_text, ax_left, ax_right, canvas, heatmap_columns)) # Передаємо heatmap_columns
+    predict_button = tk.Button(predict_controls_frame, text="Прогнозувати", state='disabled', command=lambda: app['app_logic'].on_submit(country_var, year_var, error_check_var, normalize_plot_var, app['model'], output_text, app['ax_left'], app['ax_right'], app['canvas'], app['heatmap_columns'], method_var)) # Передаємо heatmap_columns
     predict_button.grid(row=3, column=1, pady=10, padx=5, sticky='w')
 
     predict_output_container = tk.Frame(predict_frame)
@@ -99,16 +106,12 @@ def launch_gui(model):
     predict_scrollbar = ttk.Scrollbar(predict_output_container, orient=tk.VERTICAL, command=output_text.yview)
     predict_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     output_text['yscrollcommand'] = predict_scrollbar.set
+    output_text.insert(tk.END, "Завантаження даних...\n")
 
 
     plot_frame = tk.Frame(predict_frame)
     plot_frame.pack(pady=10, expand=True, fill=tk.BOTH)
 
-    fig, (ax_left, ax_right) = plt.subplots(1, 2, figsize=(14, 6))
-
-    canvas = FigureCanvasTkAgg(fig, master=plot_frame)
-    canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-
     stats_frame = ttk.LabelFrame(scrollable_frame, text="Статистичний Аналіз Даних")
     stats_frame.pack(pady=10, padx=10, fill="x")
 
@@ -117,17 +120,11 @@ def launch_gui(model):
 
     tk.Label(stats_controls_frame, text="Оберіть стовпець для аналізу:").grid(row=0, column=0, padx=5, pady=5, sticky='e')
 
-    statistical_columns = [col for col in model.df.columns if 'Population' in col and col != 'World Population Percentage']
-    statistical_columns.extend(['Area (Km²)', 'Density (per Km²)', 'Growth Rate', 'World Population Percentage'])
-    statistical_columns = [col for col in statistical_columns if col in model.df.columns]
-
     stats_column_var = tk.StringVar()
-    stats_column_menu = ttk.Combobox(stats_controls_frame, textvariable=stats_column_var, values=statistical_columns, state='readonly', width=30)
+    stats_column_menu = ttk.Combobox(stats_controls_frame, textvariable=stats_column_var, values=[], state='disabled', width=30)
     stats_column_menu.grid(row=0, column=1, padx=5, pady=5, sticky='w')
-    if statistical_columns:
-        stats_column_menu.set(statistical_columns[0])
 
-    stats_button = tk.Button(stats_controls_frame, text="Розрахувати статистику", command=lambda: display_statistics(stats_column_var.get(), model.df, stats_output_text))
+    stats_button = tk.Button(stats_controls_frame, text="Розрахувати статистику", state='disabled', command=lambda: app['app_logic'].display_statistics(stats_column_var.get(), app['model'], stats_output_text))
     stats_button.grid(row=0, column=2, padx=10, pady=5)
 
     stats_output_container = tk.Frame(stats_frame)
@@ -141,11 +138,153 @@ def launch_gui(model):
     stats_output_text['yscrollcommand'] = stats_scrollbar.set
 
 
+    diagnostics_frame = ttk.LabelFrame(scrollable_frame, text="Діагностика продуктивності")
+    diagnostics_frame.pack(pady=10, padx=10, fill="x")
+
+    diagnostics_controls_frame = tk.Frame(diagnostics_frame)
+    diagnostics_controls_frame.pack(pady=5)
+
+    instrument_var = tk.BooleanVar(value=instrumentation.enabled())
+    profile_var = tk.BooleanVar(value=instrumentation.profiling())
+
+    def on_instrument_toggle():
+        if instrument_var.get():
+            instrumentation.enable(profile=profile_var.get())
+            if 'diagnostics_after' not in app:
+                refresh_diagnostics()
+        else:
+            instrumentation.disable()
+
+    def save_diagnostics():
+        path = filedialog.asksaveasfilename(defaultextension='.json', filetypes=[('JSON', '*.json')])
+        if path:
+            instrumentation.dump(path)
+
+    def reset_diagnostics():
+        instrumentation.reset()
+        show_diagnostics()
+
+    tk.Checkbutton(diagnostics_controls_frame, text="Вимірювати час етапів", variable=instrument_var, command=on_instrument_toggle).grid(row=0, column=0, padx=5, pady=5, sticky='w')
+    tk.Checkbutton(diagnostics_controls_frame, text="cProfile для кожного прогнозу", variable=profile_var, command=on_instrument_toggle).grid(row=0, column=1, padx=5, pady=5, sticky='w')
+    tk.Button(diagnostics_controls_frame, text="Скинути", command=reset_diagnostics).grid(row=0, column=2, padx=5, pady=5)
+    tk.Button(diagnostics_controls_frame, text="Зберегти JSON...", command=save_diagnostics).grid(row=0, column=3, padx=5, pady=5)
+
+    diagnostics_output_container = tk.Frame(diagnostics_frame)
+    diagnostics_output_container.pack(pady=5, padx=10, fill="x", expand=True)
+
+    diagnostics_text = tk.Text(diagnostics_output_container, height=12, width=90, font=('Courier', 9))
+    diagnostics_text.pack(side=tk.LEFT, fill="x", expand=True)
+
+    diagnostics_scrollbar = ttk.Scrollbar(diagnostics_output_container, orient=tk.VERTICAL, command=diagnostics_text.yview)
+    diagnostics_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    diagnostics_text['yscrollcommand'] = diagnostics_scrollbar.set
+
+    def show_diagnostics():
+        position = diagnostics_text.yview()[0]
+        diagnostics_text.delete(1.0, tk.END)
+        diagnostics_text.insert(tk.END, instrumentation.format_summary())
+        diagnostics_text.yview_moveto(position)
+
+    def refresh_diagnostics():
+        # Панель оновлюється лише поки вимірювання увімкнене
+        app.pop('diagnostics_after', None)
+        show_diagnostics()
+        if instrumentation.enabled():
+            app['diagnostics_after'] = root.after(DIAGNOSTICS_REFRESH_MS, refresh_diagnostics)
+
+
+    def load_model():
+        # Фоновий потік: імпорт pandas/numpy, завантаження датасету та побудова моделі
+        try:
+            with startup_profile.phase('load dataset and build model'):
+                from extrapolation_method.model import PolynomialExtrapolationModel
+                if app['model'] is None:
+                    app['model'] = PolynomialExtrapolationModel(x_future=2025)
+        except Exception as e:
+            app['error'] = e
+            return
+
+        store_path = os.environ.get(FORECAST_STORE_ENV)
+        if store_path:
+            try:
+                from extrapolation_method.forecast_store import ForecastStore
+                if not app['model'].attach_forecast_store(ForecastStore.open(store_path)):
+                    app['store_message'] = f"Сховище прогнозів {store_path} не відповідає поточним даним, прогнози обчислюються заново\n"
+            except (OSError, ValueError, KeyError) as e:
+                app['store_message'] = f"Не вдалося відкрити сховище прогнозів {store_path}: {e}\n"
+
+    loader = threading.Thread(target=load_model, name='data-loader', daemon=True)
+    loader.start()
+
+    def create_figure():
+        # Головний потік, одразу після першого відображення вікна
+        with startup_profile.phase('import plotting stack and GUI logic'):
+            import matplotlib.pyplot as plt
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            import app_logic
+
+        with startup_profile.phase('create figure'):
+            fig, (ax_left, ax_right) = plt.subplots(1, 2, figsize=(14, 6))
+
+            canvas = FigureCanvasTkAgg(fig, master=plot_frame)
+            canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+
+        app.update(app_logic=app_logic, ax_left=ax_left, ax_right=ax_right, canvas=canvas)
+        wait_for_model()
+
+    def wait_for_model():
+        if loader.is_alive():
+            root.after(50, wait_for_model)
+            return
+        output_text.delete(1.0, tk.END)
+        if app['model'] is None:
+            output_text.insert(tk.END, f"Не вдалося завантажити дані: {app.get('error')}\n")
+            startup_profile.report()
+            return
+        # Повідомлення фонового потоку виводяться тут: віджети змінює лише головний потік
+        if app.get('store_message'):
+            output_text.insert(tk.END, app.pop('store_message'))
+        on_model_ready(app['model'])
+
+    def on_model_ready(model):
+        heatmap_columns = [col for col in model.df.columns if 'Population' in col and col != 'World Population Percentage']
+        heatmap_columns.extend(HEATMAP_EXTRA_COLUMNS)
+        heatmap_columns = [col for col in heatmap_columns if col in model.df.columns] # Фільтруємо наявні
+        app['heatmap_columns'] = heatmap_columns
+
+        # Перевірка похибки доступна для кожного року між першим і останнім відомим
+        known_years[:] = range(model.years_known[0], model.years_known[-1] + 1)
+        full_years[:] = range(model.years_known[0], FORECAST_HORIZON + 1)
+        year_menu.configure(values=full_years)
+
+        country_var.set(model.test_country)
+        country_menu.configure(values=sorted(model.df['Country/Territory'].unique().tolist()), state='readonly')
+        year_var.set(model.test_year)
+        app['app_logic'].update_years(year_var, year_menu, full_years, known_years, error_check_var)
+        error_check.configure(state='normal')
+        from extrapolation_method import methods
+        method_var.set(model.method)
+        method_menu.configure(values=methods.available_methods(), state='readonly')
+        predict_button.configure(state='normal')
+
+        statistical_columns = [col for col in model.df.columns if 'Population' in col and col != 'World Population Percentage']
+        statistical_columns.extend(HEATMAP_EXTRA_COLUMNS)
+        statistical_columns = [col for col in statistical_columns if col in model.df.columns]
+        # Роки між переписами - зі щорічного ряду моделі
+        statistical_columns.extend(model.interpolated_columns())
+        stats_column_menu.configure(values=statistical_columns, state='readonly')
+        if statistical_columns:
+            stats_column_menu.set(statistical_columns[0])
+        stats_button.configure(state='normal')
+
+        startup_profile.mark('ready')
+        startup_profile.report()
+
+    root.after(10, create_figure)
+    refresh_diagnostics()
+    root.after_idle(startup_profile.mark, 'window shown')
     root.mainloop()
 
 
 if __name__ == "__main__":
-    data = process_data()
-    model = PolynomialExtrapolationModel(data, x_future=2025)
-
-    launch_gui(model)
\ No newline at end of file
+    launch_gui()
\ No newline at end of file
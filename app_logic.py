@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
 import numpy as np
 import pandas as pd
 import tkinter as tk
 
+import instrumentation
 from extrapolation_method.model import PolynomialExtrapolationModel
 from extrapolation_method.execute_model import execute_country_forecast
 
@@ -10,43 +14,98 @@ from data_processing import preprocesing
 from data_processing import plots
 
 def update_years(year_var, year_menu, full_years, known_years, error_check_var):
+    # known_years - усі роки між першим і останнім відомим: проміжні перевіряються за інтерпольованим рядом
     if error_check_var.get():
         year_menu['values'] = known_years
         if year_var.get() not in known_years:
-            year_var.set(2022)
+            year_var.set(known_years[-1])
     else:
         year_menu['values'] = full_years
         if year_var.get() not in full_years:
-             if year_var.get() < 2071:
-                  year_var.set(2025)
+             if year_var.get() < full_years[-1] + 1:
+                  year_var.set(known_years[-1] + 3)
     year_menu.set(year_var.get())
 
 
-def on_submit(country_var, year_var, error_check_var, normalize_plot_var, model, output_text, ax_left, ax_right, canvas, heatmap_cols):
-    selected_country = country_var.get()
-    try:
-        selected_year = int(year_var.get())
-    except ValueError:
-        output_text.insert(tk.END, "Enter real year\n")
-        return
+class BackgroundRunner:
+    """
+    Runs GUI jobs on a single worker thread and hands results back to the Tk main loop.
 
-    estimate_error = error_check_var.get()
-    normalize_plot = normalize_plot_var.get()
+    Only the newest request matters: a new submit cancels a job that has not started yet,
+    and results of superseded jobs are dropped instead of being rendered (on_drop() is
+    called instead of on_done).
+    """
+
+    POLL_INTERVAL_MS = 25
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gui-worker')
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending = None
+
+    def submit(self, widget, job, on_done, on_drop=None):
+        """Runs job() in the background and calls on_done(result, error) via widget.after."""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if self._pending is not None:
+                self._pending.cancel()
+
+            def run():
+                if generation != self._generation:
+                    return None
+                return job()
+
+            future = self._executor.submit(run)
+            self._pending = future
+        widget.after(self.POLL_INTERVAL_MS, self._poll, widget, future, generation, on_done, on_drop)
+
+    def _poll(self, widget, future, generation, on_done, on_drop):
+        if not future.done():
+            widget.after(self.POLL_INTERVAL_MS, self._poll, widget, future, generation, on_done, on_drop)
+            return
+        if generation != self._generation or future.cancelled():
+            if on_drop is not None:
+                on_drop()
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            on_done(None, e)
+            return
+        on_done(result, None)
+
+
+forecast_runner = BackgroundRunner()
+
+
+def prepare_forecast(model, selected_country, selected_year, normalize_plot, heatmap_cols=None, method=None):
+    """Runs the forecast and prepares plot data; safe to call from the worker thread."""
+    if heatmap_cols is not None:
+        # Матриця кореляції кешується за версією даних, тож тут вона рахується лише раз
+        plots.correlation_matrix(model.df, heatmap_cols, model.data_version)
 
     model.test_country = selected_country
     model.x_future = selected_year
-
-    output_text.delete(1.0, tk.END)
+    if method is not None:
+        model.method = method
 
     result, plot_data = execute_country_forecast(model)
+    # Щорічний ряд між переписами береться з кешу моделі, а не інтерполюється тут
+    annual_years, annual_populations = model.annual_series(selected_country)
 
-    # --- Підготовка даних для графіка населення ---
-    plot_years, populations_for_plot = plot_data
-    plot_populations = np.array(populations_for_plot) # Працюємо з numpy масивом
-    plot_years = np.array(plot_years)
-
+    messages = []
     scaler_info = None # Для збереження інформації про скейлер, якщо нормалізація відбулася
 
+    if plot_data is None:
+        plot_years, plot_populations = np.array([]), np.array([])
+    else:
+        # --- Підготовка даних для графіка населення ---
+        plot_years, populations_for_plot = plot_data
+        plot_populations = np.array(populations_for_plot) # Працюємо з numpy масивом
+        plot_years = np.array(plot_years)
+
     if normalize_plot:
         # Застосовуємо нормалізацію до даних для графіка (історичні + прогноз)
         # normalize_country_population приймає список/масив і повертає нормалізований масив
@@ -54,18 +113,77 @@ def on_submit(country_var, year_var, error_check_var, normalize_plot_var, model,
         # Перевіряємо, чи нормалізація була успішною
         if scaler_info and scaler_info[0] is not None:
              plot_populations = normalized_plot_populations
+             annual_populations = scaler_info[0].transform(annual_populations)
              # scaler_info вже містить метод нормалізації
-             output_text.insert(tk.END, f"Дані на графіку нормалізовано ({scaler_info[1]}).\n")
+             messages.append(f"Дані на графіку нормалізовано ({scaler_info[1]}).\n")
         else:
              # Якщо нормалізація не вдалася, виводимо повідомлення
-             output_text.insert(tk.END, "Не вдалося нормалізувати дані для графіка. Відображено сирі дані.\n")
+             messages.append("Не вдалося нормалізувати дані для графіка. Відображено сирі дані.\n")
              normalize_plot = False # Вимикаємо флаг нормалізації графіка, якщо вона не вдалася
 
-    plots.plot_country_population(ax_left, plot_years, plot_populations, selected_country, normalize_plot, scaler_info)
+    return {
+        'result': result,
+        'plot_years': plot_years,
+        'plot_populations': plot_populations,
+        'annual': (annual_years, annual_populations),
+        'normalize_plot': normalize_plot,
+        'scaler_info': scaler_info,
+        'messages': messages
+    }
+
+
+def on_submit(country_var, year_var, error_check_var, normalize_plot_var, model, output_text, ax_left, ax_right, canvas, heatmap_cols, method_var=None):
+    selected_country = country_var.get()
+    try:
+        selected_year = int(year_var.get())
+    except ValueError:
+        output_text.insert(tk.END, "Enter real year\n")
+        return
+
+    estimate_error = error_check_var.get()
+    normalize_plot = normalize_plot_var.get()
+    method = method_var.get() if method_var is not None else None
+
+    output_text.delete(1.0, tk.END)
+    output_text.insert(tk.END, "Обчислення прогнозу...\n")
+
+    # Етапи одного натискання (фоновий розрахунок + малювання) збираються в один запис
+    run = instrumentation.begin_run('on_submit')
+
+    def prepare():
+        with run.attach(), instrumentation.span('gui.prepare_forecast'):
+            return prepare_forecast(model, selected_country, selected_year, normalize_plot, heatmap_cols, method)
+
+    # Розрахунок виконується у фоновому потоці, малювання - у головному циклі Tk
+    def on_done(prepared, error):
+        output_text.delete(1.0, tk.END)
+        if error is not None:
+            output_text.insert(tk.END, f"[ERROR]: {error}\n")
+            instrumentation.end_run(run)
+            return
+        with run.attach(), instrumentation.span('gui.render_forecast'):
+            render_forecast(prepared, selected_country, selected_year, estimate_error, model, output_text, ax_left, ax_right, canvas, heatmap_cols)
+        instrumentation.end_run(run)
+
+    # Замінений новішим натисканням запуск не завершиться: його етапи відкидаються
+    forecast_runner.submit(output_text, prepare, on_done, lambda: instrumentation.discard_run(run))
+
+
+def render_forecast(prepared, selected_country, selected_year, estimate_error, model, output_text, ax_left, ax_right, canvas, heatmap_cols):
+    """Draws a prepared forecast; must run on the Tk main thread."""
+    result = prepared['result']
+    for message in prepared['messages']:
+        output_text.insert(tk.END, message)
 
     # --- Малюємо теплову карту за допомогою функції з plots.py ---
     # Теплова карта будується на основі всього датасету, не лише вибраної країни
-    plots.plot_heatmap(ax_right, model.df, heatmap_cols)
+    # і перемальовується лише тоді, коли змінилися дані або набір стовпців
+    country_plot = plots.country_plot_for(ax_left, canvas)
+    if plots.plot_heatmap(ax_right, model.df, heatmap_cols, model.data_version):
+        country_plot.invalidate()
+
+    # Графік країни оновлюється через blitting: перемальовується лише ліва вісь
+    country_plot.update(prepared['plot_years'], prepared['plot_populations'], selected_country, prepared['normalize_plot'], prepared['scaler_info'], prepared['annual'])
 
     # --- Оновлюємо GUI вивід ---
     if result:
@@ -91,7 +209,8 @@ def on_submit(country_var, year_var, error_check_var, normalize_plot_var, model,
 
             if not pd.isna(actual_pop):
                 actual_pop_formatted = f"{actual_pop:,.0f}".replace(",", " ")
-                output_text.insert(tk.END, f"Фактичне населення ({selected_year}): {actual_pop_formatted}\n")
+                interpolated_note = " (інтерпольовано між переписами)" if result.get('Interpolated Actual') else ""
+                output_text.insert(tk.END, f"Фактичне населення ({selected_year}){interpolated_note}: {actual_pop_formatted}\n")
             else:
                 output_text.insert(tk.END, f"Фактичне населення ({selected_year}): Невідомо\n")
 
@@ -115,15 +234,18 @@ def on_submit(country_var, year_var, error_check_var, normalize_plot_var, model,
          output_text.insert(tk.END, f"Дані для країни '{selected_country}' не знайдені або сталася помилка при розрахунку.\n")
 
 
-    canvas.draw() # Оновлюємо Tkinter Canvas, який містить обидва графіки
-
 # display_statistics та perform_column_normalization залишаються тут або переносяться за потребою
 # (в поточному плані вони в app_logic)
 
-def display_statistics(column_name, df, output_widget):
+def display_statistics(column_name, model, output_widget):
     """Calculates and displays statistics for a given column (column-wise)."""
     output_widget.delete(1.0, tk.END)
-    stats, error = initial_analysis.calculate_statistics(df, column_name)
+    data = model.df
+    interpolated = model.interpolated_column(column_name)
+    if interpolated is not None:
+        # Рік між переписами: стовпець береться з кешованого щорічного ряду моделі
+        data = pd.DataFrame({column_name: interpolated})
+    stats, error = initial_analysis.calculate_statistics(data, column_name, model.data_version)
 
     if error:
         output_widget.insert(tk.END, f"Помилка: {error}\n")
@@ -158,5 +280,4 @@ def perform_column_normalization(column_name, df, output_widget, method='minmax'
 
      else:
           output_widget.insert(tk.END, f"Нормалізація '{column_name}' методом '{method}' не вдалася.\n")
-          if normalized_df is df:
-               output_widget.insert(tk.END, "Причина: Можливо, помилка в процесі нормалізації або стовпець не містить числових даних.\n")
\ No newline at end of file
+          output_widget.insert(tk.END, "Причина: Можливо, помилка в процесі нормалізації або стовпець не містить числових даних.\n")
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Benchmarks for the loading, preprocessing, forecasting and plotting hot paths.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 234 100000 --output bench.json
+    python -m benchmarks.run_benchmarks --compare bench_old.json
+
+Synthetic datasets keep the column layout of the Kaggle world population dataset
+and are scaled from its 234 countries up to 1M rows.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from data_processing import dataset_loading
+from data_processing import preprocesing
+from extrapolation_method import __main__ as cli
+from extrapolation_method.execute_model import execute_country_forecast
+from extrapolation_method.model import PolynomialExtrapolationModel
+
+DEFAULT_SIZES = [234, 10_000, 100_000, 1_000_000]
+# Поодинокі прогнози (як у GUI) виконуємо для обмеженої вибірки країн
+SINGLE_FORECAST_CALLS = 1000
+# Роки стовпців населення у датасеті Kaggle
+KNOWN_YEARS = [1970, 1980, 1990, 2000, 2010, 2015, 2020, 2022]
+
+
+def synthetic_dataset(rows, seed=0):
+    """Builds a frame with the Kaggle dataset schema and plausible population growth curves."""
+    rng = np.random.default_rng(seed)
+    base = rng.lognormal(mean=15, sigma=2, size=rows)
+    growth = rng.normal(0.012, 0.01, size=rows)
+    years = KNOWN_YEARS
+
+    data = {
+        'Rank': np.arange(1, rows + 1),
+        'CCA3': [f'R{i:07d}' for i in range(rows)],
+        'Country/Territory': [f'Region {i}' for i in range(rows)],
+        'Capital': [f'Capital {i}' for i in range(rows)],
+        'Continent': rng.choice(['Africa', 'Asia', 'Europe', 'North America', 'Oceania', 'South America'], size=rows),
+    }
+    for year in sorted(years, reverse=True):
+        noise = rng.normal(1, 0.01, size=rows)
+        data[f'{year} Population'] = np.round(base * np.exp(growth * (year - 1970)) * noise).astype(np.int64)
+    data['Area (Km²)'] = rng.integers(1, 10_000_000, size=rows)
+    data['Density (per Km²)'] = data['2022 Population'] / data['Area (Km²)']
+    data['Growth Rate'] = 1 + growth
+    data['World Population Percentage'] = data['2022 Population'] / data['2022 Population'].sum() * 100
+
+    frame = pd.DataFrame(data)
+    # Частина значень відсутня, як у регіональних даних
+    missing = rng.random(rows) < 0.02
+    frame.loc[missing, '1970 Population'] = np.nan
+    return frame
+
+
+def measure(func, repeat):
+    """Returns (best wall time, mean wall time, peak traced memory in bytes)."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(timings), sum(timings) / len(timings), peak
+
+
+def benchmark_cases(rows, frame, workdir, include_plots):
+    """Yields (name, callable, countries processed per call) for one dataset size."""
+    csv_path = os.path.join(workdir, f'synthetic_{rows}.csv')
+    frame.to_csv(csv_path, index=False)
+    cold_cache = os.path.join(workdir, f'cache_cold_{rows}')
+    warm_cache = os.path.join(workdir, f'cache_warm_{rows}')
+
+    def load_cold():
+        dataset_loading.CACHE_DIR = cold_cache
+        for name in os.listdir(cold_cache) if os.path.isdir(cold_cache) else []:
+            os.remove(os.path.join(cold_cache, name))
+        dataset_loading.load_dataset(source=csv_path)
+
+    def load_warm():
+        dataset_loading.CACHE_DIR = warm_cache
+        dataset_loading.load_dataset(source=csv_path)
+
+    dataset_loading.CACHE_DIR = warm_cache
+    dataset_loading.load_dataset(source=csv_path)
+
+    processed = preprocesing.process_data(frame)
+    model = PolynomialExtrapolationModel(processed, x_future=2030)
+    countries = processed['Country/Territory'].to_numpy()
+    sample = countries[np.linspace(0, len(countries) - 1, min(SINGLE_FORECAST_CALLS, len(countries))).astype(int)]
+
+    def single_forecasts():
+        for country in sample:
+            model.test_country = country
+            execute_country_forecast(model)
+
+    def full_model():
+        # Без кешу коефіцієнтів, щоб вимірювати саме підгонку
+        model.coefficient_cache.clear()
+        model.model()
+
+    yield 'load_dataset (cold cache)', load_cold, rows
+    yield 'load_dataset (warm cache)', load_warm, rows
+    yield 'process_data', lambda: preprocesing.process_data(frame), rows
+    yield 'normalize_column', lambda: preprocesing.normalize_column(processed, '2022 Population'), rows
+    yield 'PolynomialExtrapolationModel.model', full_model, rows
+    yield 'execute_country_forecast', single_forecasts, len(sample)
+
+    stream_output = os.path.join(workdir, f'stream_{rows}.csv')
+
+    def cli_stream():
+        # Прогін CLI через --stream: перевіряє і сам шлях, а не лише streaming.write_forecasts
+        with contextlib.redirect_stderr(io.StringIO()):
+            status = cli.main(['--source', csv_path, '--stream', '50000', '--years', '2030', '--output', stream_output])
+        if status != 0:
+            raise RuntimeError('--stream run failed')
+
+    yield 'cli --stream', cli_stream, rows
+
+    if include_plots:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from data_processing import plots
+
+        fig, ax = plt.subplots(figsize=(7, 6))
+        columns = [f'{year} Population' for year in KNOWN_YEARS] + ['Area (Km²)', 'Density (per Km²)', 'Growth Rate']
+        yield 'plots.plot_heatmap', lambda: plots.plot_heatmap(ax, processed, columns), rows
+
+
+def run(sizes, repeat, include_plots):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in sizes:
+            frame = synthetic_dataset(rows)
+            for name, func, countries in benchmark_cases(rows, frame, workdir, include_plots):
+                # Службові повідомлення завантажувача не засмічують звіт
+                with contextlib.redirect_stdout(io.StringIO()):
+                    best, mean, peak = measure(func, repeat)
+                result = {
+                    'name': name,
+                    'rows': rows,
+                    'wall_time_s': best,
+                    'mean_wall_time_s': mean,
+                    'peak_memory_mb': peak / 2**20,
+                    'countries_per_s': countries / best if best > 0 else None,
+                }
+                results.append(result)
+                print(f"{name:<40} {rows:>9} rows  {best * 1e3:10.2f} ms  {result['peak_memory_mb']:9.1f} MB  "
+                      f"{result['countries_per_s'] or 0:14,.0f} countries/s", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['name'], r['rows']): r for r in json.load(f)['results']}
+    print(f"\nComparison with {baseline_path} (new / old wall time):", file=sys.stderr)
+    for result in results:
+        old = baseline.get((result['name'], result['rows']))
+        if old and old['wall_time_s']:
+            ratio = result['wall_time_s'] / old['wall_time_s']
+            print(f"{result['name']:<40} {result['rows']:>9} rows  x{ratio:6.2f}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the forecasting and preprocessing hot paths.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES, help='Dataset sizes in rows')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions per benchmark')
+    parser.add_argument('--no-plots', action='store_true', help='Skip the matplotlib/seaborn benchmarks')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file for the results')
+    parser.add_argument('--compare', help='Earlier JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, not args.no_plots)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import threading
+
+from data_processing import dataset_loading
+from data_processing import preprocesing
+
+
+_lock = threading.RLock()
+_dataset = None
+_processed = None
+_compacted = False
+
+
+def get_dataset():
+    """
+    Returns the raw dataset, loading it on the first call only.
+
+    Every module should go through this function (or get_processed_data) instead of
+    calling dataset_loading.load_dataset directly, so the dataset is read once per process.
+    """
+    global _dataset
+    if _dataset is None:
+        with _lock:
+            if _dataset is None:
+                _dataset = dataset_loading.load_dataset()
+    return _dataset
+
+
+def get_processed_data(compact=False):
+    """
+    Returns the preprocessed dataset, built lazily from get_dataset() and memoised.
+
+    With compact=True the shared frame is converted in place to the lossless compact
+    dtypes of preprocesing.compact_dataset (once per load).
+    """
+    global _processed, _compacted
+    if _processed is None:
+        with _lock:
+            if _processed is None:
+                _processed = preprocesing.process_data(get_dataset())
+    if compact and not _compacted:
+        with _lock:
+            if not _compacted:
+                preprocesing.compact_dataset(_processed, inplace=True)
+                _compacted = True
+    return _processed
+
+
+def reload():
+    """Drops the memoised frames; the next access loads the dataset again."""
+    global _dataset, _processed, _compacted
+    with _lock:
+        _dataset = None
+        _processed = None
+        _compacted = False
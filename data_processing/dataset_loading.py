@@ -1,16 +1,46 @@
-import kagglehub
+import hashlib
+import json
+import os
+
+import numpy as np
 import pandas as pd
 
-def load_dataset():
+DATASET_HANDLE = "iamsouravbanerjee/world-population-dataset"
+
+# Bump when the cache layout changes so stale files are ignored.
+CACHE_VERSION = 1
+CACHE_DIR = os.environ.get(
+    'WORLD_POPULATION_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'world_population')
+)
+
+
+def load_dataset(source=None, refresh=False):
+    """
+    Loads the world population dataset, preferring the local on-disk cache.
+
+    Args:
+        source (str): Optional path to a CSV file to load instead of the Kaggle dataset.
+        refresh (bool): Skip the cache lookup and ask kagglehub for the dataset again.
+    """
+    if source is not None:
+        return _load_source(source)
+
+    if not refresh:
+        data = _load_latest_cache()
+        if data is not None:
+            return data
+
     try:
-        path_to_data = kagglehub.dataset_download("iamsouravbanerjee/world-population-dataset")
-        data = pd.read_csv(f'{path_to_data}/data.csv')
+        import kagglehub
+        path_to_data = kagglehub.dataset_download(DATASET_HANDLE)
+        data = _load_source(f'{path_to_data}/data.csv', latest=True)
         print("Successfully downloaded")
     except Exception as e:
         print(f"[ERROR]: {e}")
         print("Trying to load local data")
         try:
-            data = pd.read_csv('data.csv')
+            data = _load_source('data.csv', latest=True)
             print("Loaded local data")
         except FileNotFoundError:
             print("data.csv not found")
@@ -29,4 +59,150 @@ def load_dataset():
             }
             data = pd.DataFrame(dummy_data)
 
-    return data
\ No newline at end of file
+    return data
+
+
+def iter_dataset_chunks(source, chunksize=100_000, usecols=None):
+    """
+    Streams a CSV source chunk by chunk without touching the cache.
+
+    Args:
+        source (str): Path to the CSV file.
+        chunksize (int): Number of rows per yielded DataFrame.
+        usecols: Optional column list or callable forwarded to pd.read_csv.
+    """
+    with pd.read_csv(source, chunksize=chunksize, usecols=usecols) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def _load_source(path, latest=False):
+    """Reads a CSV source through the cache; raises FileNotFoundError if it does not exist."""
+    path = os.path.abspath(path)
+    fingerprint = _fingerprint(path)
+
+    data = _read_cache(path, fingerprint)
+    if data is None:
+        data = pd.read_csv(path)
+        _write_cache(path, fingerprint, data)
+
+    if latest:
+        _write_json(os.path.join(CACHE_DIR, 'latest.json'), {'source': path})
+    return data
+
+
+def _load_latest_cache():
+    """Returns the cached frame of the last default source, or None if there is nothing usable."""
+    try:
+        with open(os.path.join(CACHE_DIR, 'latest.json'), encoding='utf-8') as f:
+            source = json.load(f)['source']
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if os.path.exists(source):
+        # Джерело доступне: перевіряємо, чи воно не змінилося з моменту кешування
+        try:
+            return _load_source(source)
+        except Exception as e:
+            print(f"[ERROR]: {e}")
+            return None
+
+    # Джерела немає (наприклад, офлайн-машина) - використовуємо кеш як є
+    return _read_cache(source, None)
+
+
+def _cache_paths(source):
+    key = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(CACHE_DIR, f'dataset_{key}_v{CACHE_VERSION}')
+    return base + '.npz', base + '.json'
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_cache(source, fingerprint):
+    """
+    Loads the cached frame for a source.
+
+    A fingerprint of None accepts the cache unconditionally. If size/mtime differ, the
+    content hash decides, so a re-downloaded but identical file still hits the cache.
+    """
+    data_path, meta_path = _cache_paths(source)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get('version') != CACHE_VERSION:
+        return None
+
+    if fingerprint is not None and (meta.get('size'), meta.get('mtime_ns')) != (fingerprint['size'], fingerprint['mtime_ns']):
+        if meta.get('size') != fingerprint['size'] or meta.get('sha256') != _file_hash(source):
+            return None
+        meta.update(fingerprint)
+        _write_json(meta_path, meta)
+
+    try:
+        with np.load(data_path, allow_pickle=False) as archive:
+            columns = archive['__columns__'].tolist()
+            frame = {}
+            for i, column in enumerate(columns):
+                values = archive[f'c{i}']
+                if f'na{i}' in archive.files:
+                    values = values.astype(object)
+                    values[archive[f'na{i}']] = np.nan
+                frame[column] = values
+        return pd.DataFrame(frame, columns=columns)
+    except Exception as e:
+        print(f"[ERROR]: Failed to read dataset cache: {e}")
+        return None
+
+
+def _write_cache(source, fingerprint, data):
+    """Persists a frame as typed per-column arrays in a .npz archive plus a JSON sidecar."""
+    data_path, meta_path = _cache_paths(source)
+    try:
+        arrays = {'__columns__': np.array([str(column) for column in data.columns])}
+        for i, column in enumerate(data.columns):
+            series = data[column]
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                arrays[f'c{i}'] = series.to_numpy()
+            else:
+                missing = series.isna().to_numpy()
+                arrays[f'c{i}'] = series.astype(str).to_numpy(dtype=str)
+                if missing.any():
+                    arrays[f'na{i}'] = missing
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = data_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, data_path)
+
+        meta = {'version': CACHE_VERSION, 'source': source, 'sha256': _file_hash(source)}
+        meta.update(fingerprint)
+        _write_json(meta_path, meta)
+    except Exception as e:
+        print(f"[ERROR]: Failed to write dataset cache: {e}")
+
+
+def _write_json(path, payload):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[ERROR]: Failed to write {path}: {e}")
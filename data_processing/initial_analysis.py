@@ -1,7 +1,171 @@
+from collections import OrderedDict
+import threading
+
+import numpy as np
 import pandas as pd
+from data_processing import data_provider
 from data_processing import dataset_loading
 
-def calculate_statistics(data = dataset_loading.load_dataset(), column_name=""):
+# Квантилі зберігаються на фіксованій сітці, тож підсумки фрагментів можна об'єднувати
+QUANTILE_GRID = np.linspace(0, 1, 1001)
+
+_SUMMARY_CACHE_SIZE = 32
+_summary_cache = OrderedDict()
+_summary_lock = threading.Lock()
+
+
+class ColumnSummary:
+    """
+    Mergeable summary of numeric columns: count, mean, variance, min, max and quantiles.
+
+    Mean and variance use the parallel form of Welford's algorithm (Chan et al.), so
+    summaries of separate chunks merge into the summary of the whole data. Quantiles are
+    kept on QUANTILE_GRID; they are exact up to interpolation for a single frame and
+    approximate after merging chunks.
+    """
+
+    def __init__(self, columns, count, mean, m2, minimum, maximum, quantiles):
+        self.columns = list(columns)
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.minimum = minimum
+        self.maximum = maximum
+        self.quantiles = quantiles
+
+    @classmethod
+    def from_frame(cls, data, columns=None):
+        """Summarises the given (default: all numeric) columns in one vectorized pass."""
+        if columns is None:
+            columns = data.select_dtypes(include=np.number).columns.tolist()
+        values = np.column_stack([
+            pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=np.float64) for column in columns
+        ]) if columns else np.empty((len(data), 0))
+
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+        has_values = count > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, values, 0).sum(axis=0) / count
+            m2 = np.where(valid, (values - mean) ** 2, 0).sum(axis=0)
+
+        minimum = np.full(len(columns), np.nan)
+        maximum = np.full(len(columns), np.nan)
+        quantiles = np.full((len(QUANTILE_GRID), len(columns)), np.nan)
+        if has_values.any():
+            present = values[:, has_values]
+            minimum[has_values] = np.nanmin(present, axis=0)
+            maximum[has_values] = np.nanmax(present, axis=0)
+            quantiles[:, has_values] = np.nanquantile(present, QUANTILE_GRID, axis=0)
+
+        return cls(columns, count, np.where(has_values, mean, np.nan), np.where(has_values, m2, np.nan), minimum, maximum, quantiles)
+
+    def merge(self, other):
+        """Returns the summary of the union of both inputs; columns must match."""
+        if self.columns != other.columns:
+            raise ValueError("Cannot merge summaries of different columns")
+
+        count = self.count + other.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            mean = self.mean + delta * other.count / count
+            m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / count
+
+        # Колонки, порожні в одному з підсумків, беруться з іншого без змін
+        only_self = other.count == 0
+        only_other = self.count == 0
+        mean = np.where(only_self, self.mean, np.where(only_other, other.mean, mean))
+        m2 = np.where(only_self, self.m2, np.where(only_other, other.m2, m2))
+
+        quantiles = np.where(only_self, self.quantiles, other.quantiles)
+        for i in np.flatnonzero(~only_self & ~only_other):
+            quantiles[:, i] = _merge_quantiles(self.quantiles[:, i], self.count[i], other.quantiles[:, i], other.count[i])
+
+        return ColumnSummary(
+            self.columns, count, mean, m2,
+            np.fmin(self.minimum, other.minimum),
+            np.fmax(self.maximum, other.maximum),
+            quantiles
+        )
+
+    @property
+    def variance(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def quantile(self, q):
+        """Interpolates quantile q (0..1) for every column."""
+        return np.array([np.interp(q, QUANTILE_GRID, self.quantiles[:, i]) for i in range(len(self.columns))])
+
+    def to_frame(self):
+        return pd.DataFrame({
+            'count': self.count,
+            'mean': self.mean,
+            'var': self.variance,
+            'std': self.std,
+            'min': self.minimum,
+            '25%': self.quantile(0.25),
+            '50%': self.quantile(0.5),
+            '75%': self.quantile(0.75),
+            'max': self.maximum,
+        }, index=pd.Index(self.columns, name='column'))
+
+
+def _merge_quantiles(quantiles_a, count_a, quantiles_b, count_b):
+    # Змішуємо дві емпіричні функції розподілу і обертаємо результат на сітці квантилів
+    support = np.union1d(quantiles_a, quantiles_b)
+    cdf = (count_a * np.interp(support, quantiles_a, QUANTILE_GRID) + count_b * np.interp(support, quantiles_b, QUANTILE_GRID)) / (count_a + count_b)
+    return np.interp(QUANTILE_GRID, cdf, support)
+
+
+def describe_columns(data, columns=None, data_version=None):
+    """
+    Returns a ColumnSummary for the given columns, cached per (data_version, columns).
+
+    Without a data_version the summary is always recomputed.
+    """
+    if columns is not None:
+        columns = list(columns)
+    key = (data_version, None if columns is None else tuple(columns))
+    if data_version is not None:
+        with _summary_lock:
+            if key in _summary_cache:
+                _summary_cache.move_to_end(key)
+                return _summary_cache[key]
+
+    summary = ColumnSummary.from_frame(data, columns)
+
+    if data_version is not None:
+        with _summary_lock:
+            _summary_cache[key] = summary
+            while len(_summary_cache) > _SUMMARY_CACHE_SIZE:
+                _summary_cache.popitem(last=False)
+    return summary
+
+
+def summarize_chunks(chunks, columns=None):
+    """Merges summaries of an iterable of DataFrames; returns None for no chunks."""
+    summary = None
+    for chunk in chunks:
+        part = ColumnSummary.from_frame(chunk, columns)
+        if columns is None:
+            columns = part.columns
+        summary = part if summary is None else summary.merge(part)
+    return summary
+
+
+def summarize_file(source, columns=None, chunksize=100_000):
+    """Summarises a CSV file that may be too large to load at once."""
+    return summarize_chunks(dataset_loading.iter_dataset_chunks(source, chunksize=chunksize, usecols=columns), columns)
+
+
+def calculate_statistics(data=None, column_name="", data_version=None):
+    if data is None:
+        data = data_provider.get_dataset()
     if column_name not in data.columns:
         return None, "Column not found"
     column_data = data[column_name]
@@ -10,25 +174,18 @@ def calculate_statistics(data = dataset_loading.load_dataset(), column_name=""):
         return None, "Only NaN/0."
 
     try:
-        numeric_data = pd.to_numeric(column_data, errors='coerce').dropna()
+        summary = describe_columns(data, [column_name], data_version)
 
-        if numeric_data.empty:
+        if summary.count[0] == 0:
             return None, "Only NaN/0 in column"
 
-        mean = numeric_data.mean()
-        median = numeric_data.median()
-        variance = numeric_data.var()
-        std_dev = numeric_data.std()
-        maximum = numeric_data.max
-        minimum = numeric_data.min()
-
         stats = {
-            'Математичне сподівання (Середнє)': mean,
-            'Медіана': median,
-            'Дисперсія': variance,
-            'Середньоквадратичне відхилення': std_dev,
-            'Максимальне значення': maximum,
-            'Мінімальне значення': minimum
+            'Математичне сподівання (Середнє)': summary.mean[0],
+            'Медіана': summary.quantile(0.5)[0],
+            'Дисперсія': summary.variance[0],
+            'Середньоквадратичне відхилення': summary.std[0],
+            'Максимальне значення': summary.maximum[0],
+            'Мінімальне значення': summary.minimum[0]
         }
         return stats, None
     except Exception as e:
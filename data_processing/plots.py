@@ -3,7 +3,19 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
 import pandas as pd
 import numpy as np
-import seaborn as sns # Для теплової карти
+from collections import OrderedDict
+import threading
+import weakref
+
+import instrumentation
+
+
+_CORRELATION_CACHE_SIZE = 16
+_correlation_cache = OrderedDict()
+_correlation_lock = threading.Lock()
+# Для кожної осі запам'ятовуємо, яку теплову карту на ній вже намальовано
+_heatmap_state = weakref.WeakKeyDictionary()
+ANNUAL_LABEL = 'Щорічно (інтерпольовано)'
 
 
 def y_axis_formatter(x, pos, normalize_plot=False):
@@ -19,7 +31,55 @@ def y_axis_formatter(x, pos, normalize_plot=False):
         return f'{x:.0f}'
 
 
-def plot_country_population(ax, years, populations, country_name, normalize_plot=False, scaler_info=None):
+def _y_axis_layout(populations, normalize_plot=False, scaler_info=None):
+    """Returns (y_ticks, (y_min, y_max), y_label) for the country population plot."""
+    all_valid_plot_values = populations[~np.isnan(populations)]
+    y_min = np.min(all_valid_plot_values) if all_valid_plot_values.size > 0 else 0
+    y_max = np.max(all_valid_plot_values) if all_valid_plot_values.size > 0 else 1 # Дефолтне значення, якщо даних немає
+
+
+    # Визначення кроку та меж для вісі Y
+    if normalize_plot:
+         y_min_norm = np.min(populations) if populations[~np.isnan(populations)].size > 0 else -1
+         y_max_norm = np.max(populations) if populations[~np.isnan(populations)].size > 0 else 1
+         tick_step = (y_max_norm - y_min_norm) / 5 if (y_max_norm - y_min_norm) > 0 else 1
+         y_ticks = np.linspace(y_min_norm, y_max_norm, 5) # 5 позначок для нормалізованих даних
+         y_lim_min, y_lim_max = y_min_norm, y_max_norm
+         y_label = f'Нормалізоване населення ({scaler_info[1]})' if scaler_info else 'Нормалізоване населення'
+    else:
+         y_label = 'Населення'
+         # Логіка для визначення кроку для сирих даних
+         tick_step = (y_max - y_min) / 5
+         if tick_step > 0:
+             power = np.floor(np.log10(tick_step))
+             tick_step = np.ceil(tick_step / (10**power)) * (10**power)
+         else:
+             tick_step = 1_000_000 # Дефолтний крок, якщо дані нульові або однакові
+
+         if tick_step < 1000: tick_step = 1000
+         elif tick_step < 10000: tick_step = 10000
+         elif tick_step < 100000: tick_step = 100000
+         elif tick_step < 1000000: tick_step = 1000000
+         elif tick_step < 10000000: tick_step = 5000000
+
+         tick_start = int(np.floor(y_min / tick_step) * tick_step)
+         tick_end = int(np.ceil(y_max / tick_step) * tick_step)
+
+         if tick_end <= tick_start and y_max > y_min:
+             tick_end = tick_start + tick_step
+         elif tick_end <= tick_start and y_max == y_min:
+             tick_start = y_min * 0.9 if y_min > 0 else -1 # Невеликий діапазон для однакових ненульових значень
+             tick_end = y_max * 1.1 if y_max > 0 else 1 # Невеликий діапазон
+             tick_step = (tick_end - tick_start) / 5 if (tick_end - tick_start) > 0 else 1
+
+         y_ticks = np.arange(tick_start, tick_end + tick_step/2, tick_step)
+         y_lim_min, y_lim_max = tick_start, tick_end # + (tick_step if not normalize_plot else 0)) # Додаємо невеликий відступ зверху
+
+    return y_ticks, (y_lim_min, y_lim_max), y_label
+
+
+@instrumentation.timed('plots.plot_country_population')
+def plot_country_population(ax, years, populations, country_name, normalize_plot=False, scaler_info=None, annual=None):
     ax.clear() # Очищаємо попередній графік
 
     if years.size > 0 and not np.all(np.isnan(populations)):
@@ -36,6 +96,9 @@ def plot_country_population(ax, years, populations, country_name, normalize_plot
         valid_historical_plot_populations = historical_plot_populations[valid_history_indices]
 
 
+        if annual is not None and len(annual[0]) > 0: # Щорічний ряд між переписами
+            ax.plot(annual[0], annual[1], linestyle='--', linewidth=1, label=ANNUAL_LABEL, color='steelblue')
+
         if valid_historical_plot_years.size > 0: # Малюємо історичні дані, якщо вони є
             ax.plot(valid_historical_plot_years, valid_historical_plot_populations, marker='o', linestyle='-', label='Історичні дані', color='skyblue')
 
@@ -43,48 +106,7 @@ def plot_country_population(ax, years, populations, country_name, normalize_plot
             ax.plot(forecast_year, forecast_population, marker='o', color='red', label='Прогноз', markersize=8)
 
         # Налаштування вісі Y
-        all_valid_plot_values = populations[~np.isnan(populations)]
-        y_min = np.min(all_valid_plot_values) if all_valid_plot_values.size > 0 else 0
-        y_max = np.max(all_valid_plot_values) if all_valid_plot_values.size > 0 else 1 # Дефолтне значення, якщо даних немає
-
-
-        # Визначення кроку та меж для вісі Y
-        if normalize_plot:
-             y_min_norm = np.min(populations) if populations[~np.isnan(populations)].size > 0 else -1
-             y_max_norm = np.max(populations) if populations[~np.isnan(populations)].size > 0 else 1
-             tick_step = (y_max_norm - y_min_norm) / 5 if (y_max_norm - y_min_norm) > 0 else 1
-             y_ticks = np.linspace(y_min_norm, y_max_norm, 5) # 5 позначок для нормалізованих даних
-             y_lim_min, y_lim_max = y_min_norm, y_max_norm
-             y_label = f'Нормалізоване населення ({scaler_info[1]})' if scaler_info else 'Нормалізоване населення'
-        else:
-             y_label = 'Населення'
-             # Логіка для визначення кроку для сирих даних
-             tick_step = (y_max - y_min) / 5
-             if tick_step > 0:
-                 power = np.floor(np.log10(tick_step))
-                 tick_step = np.ceil(tick_step / (10**power)) * (10**power)
-             else:
-                 tick_step = 1_000_000 # Дефолтний крок, якщо дані нульові або однакові
-
-             if tick_step < 1000: tick_step = 1000
-             elif tick_step < 10000: tick_step = 10000
-             elif tick_step < 100000: tick_step = 100000
-             elif tick_step < 1000000: tick_step = 1000000
-             elif tick_step < 10000000: tick_step = 5000000
-
-             tick_start = int(np.floor(y_min / tick_step) * tick_step)
-             tick_end = int(np.ceil(y_max / tick_step) * tick_step)
-
-             if tick_end <= tick_start and y_max > y_min:
-                 tick_end = tick_start + tick_step
-             elif tick_end <= tick_start and y_max == y_min:
-                 tick_start = y_min * 0.9 if y_min > 0 else -1 # Невеликий діапазон для однакових ненульових значень
-                 tick_end = y_max * 1.1 if y_max > 0 else 1 # Невеликий діапазон
-                 tick_step = (tick_end - tick_start) / 5 if (tick_end - tick_start) > 0 else 1
-
-             y_ticks = np.arange(tick_start, tick_end + tick_step/2, tick_step)
-             y_lim_min, y_lim_max = tick_start, tick_end # + (tick_step if not normalize_plot else 0)) # Додаємо невеликий відступ зверху
-
+        y_ticks, (y_lim_min, y_lim_max), y_label = _y_axis_layout(populations, normalize_plot, scaler_info)
 
         ax.set(
             yticks=y_ticks,
@@ -116,7 +138,149 @@ def plot_country_population(ax, years, populations, country_name, normalize_plot
     plt.tight_layout(rect=[0, 0, 1, 0.95]) # Коригуємо розмір графіка, щоб уникнути обрізання міток
 
 
-def plot_heatmap(ax, dataframe, columns_to_include):
+class CountryPopulationPlot:
+    """
+    Persistent-artist version of plot_country_population.
+
+    The history line, the annual (interpolated) line and the forecast marker are created
+    once and updated with set_data.
+    Redraws blit a cached background of the rest of the figure (e.g. the heatmap) and
+    re-render only this Axes. Any full canvas draw, such as a resize, invalidates the
+    background; call invalidate() after changing other artists of the figure.
+    """
+
+    def __init__(self, ax, canvas):
+        self.ax = ax
+        self.canvas = canvas
+        self._history_line = None
+        self._annual_line = None
+        self._forecast_marker = None
+        self._normalize_plot = False
+        self._background = None
+        self._capturing = False
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        if not self._capturing:
+            self._background = None
+
+    def invalidate(self):
+        self._background = None
+
+    def _artists_alive(self):
+        return self._history_line is not None and self._history_line.axes is self.ax and self._history_line in self.ax.lines
+
+    def _setup(self):
+        ax = self.ax
+        ax.clear()
+        self._history_line, = ax.plot([], [], marker='o', linestyle='-', label='Історичні дані', color='skyblue')
+        self._annual_line, = ax.plot([], [], linestyle='--', linewidth=1, label=ANNUAL_LABEL, color='steelblue')
+        self._forecast_marker, = ax.plot([], [], marker='o', linestyle='', color='red', label='Прогноз', markersize=8)
+        # Форматер читає поточний режим, тому його не треба створювати заново
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: y_axis_formatter(x, pos, self._normalize_plot)))
+        ax.legend(loc='upper left')
+        ax.grid(True, linestyle='--', alpha=0.6)
+        self._background = None
+
+    @instrumentation.timed('plots.country_plot_update')
+    def update(self, years, populations, country_name, normalize_plot=False, scaler_info=None, annual=None):
+        """Same arguments as plot_country_population; redraws only this Axes."""
+        if years.size == 0 or np.all(np.isnan(populations)):
+            plot_country_population(self.ax, years, populations, country_name, normalize_plot, scaler_info, annual)
+            self._history_line = None
+            self.canvas.draw_idle()
+            return
+
+        if not self._artists_alive():
+            self._setup()
+
+        history = ~np.isnan(populations[:-1])
+        self._history_line.set_data(years[:-1][history], populations[:-1][history])
+        if annual is None:
+            self._annual_line.set_data([], [])
+        else:
+            self._annual_line.set_data(*annual)
+        if np.isnan(populations[-1]):
+            self._forecast_marker.set_data([], [])
+        else:
+            self._forecast_marker.set_data([years[-1]], [populations[-1]])
+
+        self._normalize_plot = normalize_plot
+        y_ticks, y_limits, y_label = _y_axis_layout(populations, normalize_plot, scaler_info)
+        self.ax.set(yticks=y_ticks, ylabel=y_label, ylim=y_limits, title=f'Динаміка населення для {country_name}')
+        self.ax.set_xticks(years)
+        self.ax.set_xticklabels([str(int(year)) for year in years], rotation=45, ha='right')
+        self.ax.set_xlim(years.min() - 2, years.max() + 2)
+
+        self._blit()
+
+    def _blit(self):
+        if not getattr(self.canvas, 'supports_blit', False):
+            self.canvas.draw_idle()
+            return
+
+        figure = self.canvas.figure
+        if self._background is None:
+            # Фон - уся фігура без цієї осі; повне малювання виконується лише тут
+            self._capturing = True
+            try:
+                figure.tight_layout(rect=[0, 0, 1, 0.95]) # Розмітку перераховуємо разом із повним малюванням
+                self.ax.set_visible(False)
+                with instrumentation.span('canvas.draw'):
+                    self.canvas.draw()
+                self._background = self.canvas.copy_from_bbox(figure.bbox)
+            finally:
+                self.ax.set_visible(True)
+                self._capturing = False
+
+        with instrumentation.span('canvas.blit'):
+            self.canvas.restore_region(self._background)
+            figure.draw_artist(self.ax)
+            self.canvas.blit(figure.bbox)
+
+
+_country_plots = weakref.WeakKeyDictionary()
+
+
+def country_plot_for(ax, canvas):
+    """Returns the CountryPopulationPlot bound to ax, creating it on first use."""
+    plot = _country_plots.get(ax)
+    if plot is None or plot.canvas is not canvas:
+        plot = CountryPopulationPlot(ax, canvas)
+        _country_plots[ax] = plot
+    return plot
+
+
+def correlation_matrix(dataframe, columns_to_include, data_version=None):
+    """
+    Returns the correlation matrix of the numeric columns among columns_to_include.
+
+    When data_version is given the result is cached per (data_version, columns), so
+    repeated calls for unchanged data skip the O(rows x columns^2) computation.
+    """
+    key = (data_version, tuple(columns_to_include))
+    if data_version is not None:
+        with _correlation_lock:
+            if key in _correlation_cache:
+                _correlation_cache.move_to_end(key)
+                return _correlation_cache[key]
+
+    numeric_cols = dataframe[columns_to_include].select_dtypes(include=np.number)
+    if numeric_cols.empty or numeric_cols.shape[1] < 2:
+        correlation = None
+    else:
+        correlation = numeric_cols.corr()
+
+    if data_version is not None:
+        with _correlation_lock:
+            _correlation_cache[key] = correlation
+            while len(_correlation_cache) > _CORRELATION_CACHE_SIZE:
+                _correlation_cache.popitem(last=False)
+    return correlation
+
+
+@instrumentation.timed('plots.plot_heatmap')
+def plot_heatmap(ax, dataframe, columns_to_include, data_version=None):
     """
     Plots a correlation heatmap for specified numerical columns in a DataFrame on a given Axes object.
 
@@ -124,34 +288,50 @@ def plot_heatmap(ax, dataframe, columns_to_include):
         ax (matplotlib.axes.Axes): The Axes object to draw on.
         dataframe (pd.DataFrame): The input DataFrame.
         columns_to_include (list): A list of column names to include in the heatmap.
+        data_version: Optional version of the data; when it and the columns match the
+            heatmap already drawn on ax, nothing is redrawn.
+
+    Returns:
+        bool: True if the heatmap artists were rebuilt.
     """
+    key = (data_version, tuple(columns_to_include))
+    previous = _heatmap_state.get(ax)
+    if data_version is not None and previous is not None and previous[0] == key:
+        return False
+
+    # Прибираємо кольорову шкалу попередньої теплової карти, щоб вона не накопичувалася
+    if previous is not None and previous[1] is not None:
+        previous[1].remove()
+    _heatmap_state[ax] = (key, None)
+
     ax.clear() # Очищаємо попередній графік
 
-    # Вибираємо тільки числові стовпці з тих, що вказані для включення
-    numeric_cols = dataframe[columns_to_include].select_dtypes(include=np.number)
+    # Розраховуємо матрицю кореляції лише для числових стовпців з тих, що вказані для включення
+    correlation_matrix_df = correlation_matrix(dataframe, columns_to_include, data_version)
 
-    if numeric_cols.empty or numeric_cols.shape[1] < 2:
+    if correlation_matrix_df is None:
          ax.text(0.5, 0.5, "Недостатньо числових стовпців для теплової карти.", horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
          ax.set_title('Теплова карта кореляцій')
          ax.set_xticks([])
          ax.set_yticks([])
-         return
-
-    # Розраховуємо матрицю кореляції
-    correlation_matrix = numeric_cols.corr()
+         return True
 
-    if correlation_matrix.empty:
+    if correlation_matrix_df.empty:
          ax.text(0.5, 0.5, "Не вдалося розрахувати матрицю кореляції.", horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
          ax.set_title('Теплова карта кореляцій')
          ax.set_xticks([])
          ax.set_yticks([])
-         return
+         return True
 
-    # Малюємо теплову карту
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt=".2f", linewidths=.5, ax=ax)
+    # Малюємо теплову карту; seaborn імпортується лише тут, щоб не сповільнювати запуск
+    import seaborn as sns
+    sns.heatmap(correlation_matrix_df, annot=True, cmap='coolwarm', fmt=".2f", linewidths=.5, ax=ax)
+    colorbar = ax.collections[0].colorbar if ax.collections else None
+    _heatmap_state[ax] = (key, colorbar)
 
     ax.set_title('Теплова карта кореляцій')
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
     plt.setp(ax.get_yticklabels(), rotation=0)
 
-    plt.tight_layout(rect=[0, 0, 1, 0.95]) # Коригуємо розмір, якщо потрібно
\ No newline at end of file
+    plt.tight_layout(rect=[0, 0, 1, 0.95]) # Коригуємо розмір, якщо потрібно
+    return True
@@ -1,77 +1,230 @@
+import warnings
+
 import numpy as np
 import pandas as pd
-from data_processing import dataset_loading
-from sklearn.preprocessing import StandardScaler # Для нормалізації
 
 
-def process_data():
-    data = dataset_loading.load_dataset()
+def process_data(data, inplace=False, compact=False):
+    # Набір даних передається явно; спільну копію дає data_provider.get_processed_data
+    if inplace:
+        # Для потокової обробки: не копіюємо фрагмент даних
+        data.fillna(0, inplace=True)
+        data_processed = data
+    else:
+        data_processed = data.fillna(0)
 
-    data_processed = data.fillna(0)
+    if compact:
+        data_processed = compact_dataset(data_processed, inplace=True)
 
     return data_processed
 
 
-def normalize_column(df, column_name):
+# Рядкові стовпці стають категоріальними, лише якщо значення повторюються
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+# Цілі числа до 2**53 точно представлені і у float64, і в int64
+MAX_EXACT_INTEGER = 2 ** 53
+
+
+def compact_dataset(df, inplace=False):
+    """
+    Shrinks a frame without losing information.
+
+    String columns with repeated values become categorical, integer columns and
+    integral float columns (up to MAX_EXACT_INTEGER in magnitude) are downcast to the
+    smallest integer type that holds them, and other float columns become float32 when
+    the round trip is exact.
+    """
+    if not inplace:
+        df = df.copy()
+
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(series):
+            continue
+
+        if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if len(series) and series.nunique(dropna=True) <= CATEGORY_MAX_UNIQUE_RATIO * len(series):
+                df[column] = series.astype('category')
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy()
+            finite = np.isfinite(values)
+            # Ціле значення поза MAX_EXACT_INTEGER переповнило б int64 або вже втратило точність
+            if (len(values) and finite.all() and np.abs(values).max() <= MAX_EXACT_INTEGER
+                    and np.array_equal(values, np.round(values))):
+                df[column] = pd.to_numeric(series.astype(np.int64), downcast='integer')
+                continue
+            as_float32 = values.astype(np.float32)
+            if np.array_equal(as_float32.astype(values.dtype), values, equal_nan=True):
+                df[column] = as_float32
+
+    return df
+
+
+NORMALIZATION_METHODS = ('minmax', 'standard', 'robust')
+
+
+class ColumnScaler:
+    """
+    NaN-aware column-wise scaler for 2-D arrays.
+
+    Methods:
+        'minmax': (x - min) / (max - min)
+        'standard': (x - mean) / std (population std, as in sklearn's StandardScaler)
+        'robust': (x - median) / IQR
+
+    Fitted parameters are kept in center_ and scale_ for inverse_transform. A zero
+    scale is replaced by 1 so constant columns map to 0. With axis=1 every row is
+    scaled independently instead (e.g. one population series per row).
+    """
+
+    def __init__(self, method='standard', axis=0):
+        if method not in NORMALIZATION_METHODS:
+            raise ValueError(f"Unknown normalization method '{method}', expected one of {NORMALIZATION_METHODS}")
+        self.method = method
+        self.axis = axis
+        self.center_ = None
+        self.scale_ = None
+
+    def fit(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        with warnings.catch_warnings():
+            # Повністю порожні стовпці отримують NaN-параметри
+            warnings.simplefilter('ignore', RuntimeWarning)
+            if self.method == 'minmax':
+                center = np.nanmin(values, axis=self.axis, keepdims=True)
+                scale = np.nanmax(values, axis=self.axis, keepdims=True) - center
+            elif self.method == 'standard':
+                center = np.nanmean(values, axis=self.axis, keepdims=True)
+                scale = np.nanstd(values, axis=self.axis, keepdims=True)
+            else:
+                q25, center, q75 = np.nanpercentile(values, [25, 50, 75], axis=self.axis, keepdims=True)
+                scale = q75 - q25
+        self.center_ = center
+        self.scale_ = np.where(scale == 0, 1.0, scale)
+        return self
+
+    def transform(self, values, out=None):
+        values = np.asarray(values, dtype=np.float64)
+        out = np.subtract(values, self.center_, out=out)
+        return np.divide(out, self.scale_, out=out)
+
+    def fit_transform(self, values, out=None):
+        return self.fit(values).transform(values, out=out)
+
+    def inverse_transform(self, values, out=None):
+        values = np.asarray(values, dtype=np.float64)
+        out = np.multiply(values, self.scale_, out=out)
+        return np.add(out, self.center_, out=out)
+
+
+def _numeric_matrix(df, columns):
+    # Один float64-масив (рядки x стовпці) без копіювання всього DataFrame
+    matrix = np.empty((len(df), len(columns)), dtype=np.float64)
+    for i, column in enumerate(columns):
+        series = df[column]
+        if not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors='coerce')
+        matrix[:, i] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return matrix
+
+
+def normalize_values(df, columns, method='standard'):
+    """
+    Normalizes several columns in one vectorized call without touching df.
+
+    Returns:
+        tuple: (array of shape (rows, len(columns)), fitted ColumnScaler)
+    """
+    matrix = _numeric_matrix(df, list(columns))
+    scaler = ColumnScaler(method)
+    scaler.fit_transform(matrix, out=matrix)
+    return matrix, scaler
+
+
+def normalize_columns(df, columns, method='standard', inplace=True):
+    """
+    Adds '<column>_Normalized_<method>' columns for every column in columns.
+
+    Args:
+        inplace (bool): Insert the new columns into df itself; otherwise return a
+            DataFrame with only the new columns (df is left untouched).
+
+    Returns:
+        tuple: (DataFrame, fitted ColumnScaler)
+    """
+    columns = list(columns)
+    normalized, scaler = normalize_values(df, columns, method)
+    names = [f'{column}_Normalized_{method}' for column in columns]
+
+    if not inplace:
+        return pd.DataFrame(normalized, index=df.index, columns=names), scaler
+
+    for i, name in enumerate(names):
+        df[name] = normalized[:, i]
+    return df, scaler
+
+
+def normalize_column(df, column_name, method='standard', inplace=True):
+    """
+    Adds a '<column_name>_Normalized_<method>' column; returns df unchanged on error.
+
+    With inplace=False only a one-column DataFrame with the new column is returned.
+    """
     if column_name not in df.columns:
         print(f"Помилка нормалізації стовпця: Стовпець '{column_name}' не знайдено.")
-        return df.copy()
-
-    df_normalized = df.copy()
-
-    col_to_normalize = pd.to_numeric(df_normalized[column_name], errors='coerce')
-
-    valid_indices = col_to_normalize.dropna().index
-    data_for_scaling = col_to_normalize.loc[valid_indices].values.reshape(-1, 1)
-
-    if data_for_scaling.size == 0:
-        print(f"Помилка нормалізації стовпця: Стовпець '{column_name}' не містить числових даних для нормалізації.")
-        return df.copy()
+        return df
 
     try:
-        scaler = StandardScaler()
-
-        normalized_data = scaler.fit_transform(data_for_scaling)
-
-        # Створюємо нормалізовану серію з оригінальними індексами
-        normalized_series = pd.Series(normalized_data.flatten(), index=valid_indices, name=f'{column_name}_Normalized_')
-
-        old_col_name_standard = f'{column_name}_Normalized_standard'
-        df_normalized = df_normalized.drop(columns=[old_col_name_standard])
-
-
-        df_normalized = df_normalized.join(normalized_series)
-
-        return df_normalized
-
+        normalized, _ = normalize_values(df, [column_name], method)
     except Exception as e:
         print(f"Помилка нормалізації стовпця для стовпця '{column_name}': {e}")
-        return df.copy()
+        return df
 
+    if np.isnan(normalized).all():
+        print(f"Помилка нормалізації стовпця: Стовпець '{column_name}' не містить числових даних для нормалізації.")
+        return df
 
-def normalize_country_population(population_series):
+    normalized_name = f'{column_name}_Normalized_{method}'
+    if not inplace:
+        return pd.DataFrame({normalized_name: normalized[:, 0]}, index=df.index)
+    df[normalized_name] = normalized[:, 0]
+    return df
 
-    data_for_scaling = np.array(population_series).reshape(-1, 1)
 
+def normalize_country_population(population_series):
+    """
+    Standardizes one population series, ignoring NaN values.
 
-    nan_indices = np.isnan(data_for_scaling).flatten()
-    valid_data = data_for_scaling[~nan_indices]
+    Returns:
+        tuple: (normalized array, (fitted ColumnScaler, 'standard')), or the input
+        array and (None, None) if there is nothing to normalize.
+    """
+    data_for_scaling = np.asarray(population_series, dtype=np.float64)
 
-    if valid_data.size == 0:
+    if np.isnan(data_for_scaling).all():
         print("Помилка нормалізації рядка: Немає числових даних для нормалізації.")
 
         return np.array(population_series), (None, None)
 
     try:
-        scaler = StandardScaler()
-
-        normalized_valid_data = scaler.fit_transform(valid_data)
+        scaler = ColumnScaler('standard')
+        normalized_full_data = scaler.fit_transform(data_for_scaling)
 
-        normalized_full_data = np.full(data_for_scaling.shape, np.nan)
-        normalized_full_data[~nan_indices] = normalized_valid_data
-
-        return normalized_full_data.flatten(), scaler
+        return normalized_full_data, (scaler, scaler.method)
 
     except Exception as e:
         print(f"[ERROR]: {e}")
-        return np.array(population_series), (None, None)
\ No newline at end of file
+        return np.array(population_series), (None, None)
+
+
+def normalize_country_populations(population_matrix, method='standard'):
+    """
+    Normalizes every row (one country's series) of a population matrix in one operation.
+
+    Returns:
+        tuple: (normalized matrix, ColumnScaler fitted with axis=1)
+    """
+    scaler = ColumnScaler(method, axis=1)
+    return scaler.fit_transform(population_matrix), scaler
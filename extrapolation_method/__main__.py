@@ -0,0 +1,208 @@
+"""
+Headless batch forecaster.
+
+Usage examples:
+    python -m extrapolation_method --years 2025 --output forecast.csv
+    python -m extrapolation_method --countries Ukraine Poland --years 2023-2070 --output grid.parquet
+    python -m extrapolation_method --source regions.csv --stream 100000 --output regions.csv
+    python -m extrapolation_method --years 2023-2070 --store forecasts/world
+    python -m extrapolation_method --method logistic --years 2023-2100 --output logistic.parquet
+    python -m extrapolation_method --source regions.csv --years 2023-2070 --incremental state.npz --store forecasts/regions
+    python -m extrapolation_method --years 2030 --interval 0.9 --bootstrap 2000 --workers 4 --output bands.csv
+"""
+import argparse
+import contextlib
+import os
+import sys
+
+import numpy as np
+
+import instrumentation
+from data_processing import data_provider
+from data_processing import dataset_loading
+from data_processing import preprocesing
+from extrapolation_method import incremental
+from extrapolation_method import methods
+from extrapolation_method.forecast_store import ForecastStore, data_signature
+from extrapolation_method.model import PolynomialExtrapolationModel
+from extrapolation_method import streaming
+
+OUTPUT_FORMATS = ('csv', 'json', 'parquet')
+
+
+def parse_years(values):
+    """Expands '2025' and '2023-2070' style arguments into a sorted list of years."""
+    years = set()
+    for value in values:
+        if '-' in value:
+            start, end = value.split('-', 1)
+            years.update(range(int(start), int(end) + 1))
+        else:
+            years.add(int(value))
+    return sorted(years)
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value}")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m extrapolation_method', description='Batch population forecasts without the GUI.')
+    parser.add_argument('--source', help='CSV file to use instead of the Kaggle dataset')
+    parser.add_argument('--countries', nargs='+', help='Countries/regions to forecast (default: all)')
+    parser.add_argument('--years', nargs='+', default=['2025'], help="Target years, e.g. 2025 or 2023-2070")
+    parser.add_argument('--method', choices=methods.available_methods(), default='polynomial', help='Extrapolation method')
+    parser.add_argument('--degree', type=int, default=2, help='Polynomial degree (polynomial method only)')
+    parser.add_argument('--calculate-error', action='store_true', help='Add error columns for a single known year')
+    parser.add_argument('--interval', type=float, metavar='LEVEL', help='Add prediction interval bounds for a single year, e.g. 0.95')
+    parser.add_argument('--bootstrap', type=positive_int, metavar='N', help='Use N residual-bootstrap resamples for --interval instead of the analytic interval')
+    parser.add_argument('--workers', type=int, default=1, help='Process pool size for --bootstrap')
+    parser.add_argument('--float32', action='store_true', help='Store multi-year grids as float32')
+    parser.add_argument('--compact', action='store_true', help='Use categorical/downcast dtypes for the loaded dataset')
+    parser.add_argument('--stream', type=int, metavar='CHUNKSIZE', help='Process --source in chunks (CSV output, single year)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, help='Output format (default: from the output extension)')
+    parser.add_argument('--output', '-o', help='Output file (default: CSV to stdout)')
+    parser.add_argument('--instrument', metavar='PATH', help='Record per-stage timings of this run and write them to PATH as JSON')
+    parser.add_argument('--incremental', metavar='STATE', help='Refit only rows changed since the fit saved in STATE (.npz), then update STATE and patch --store in place')
+    parser.add_argument('--store', metavar='PATH', help='Write a memory-mapped forecast store (PATH.npy + PATH.json) for all countries and --years')
+    return parser
+
+
+def output_format(args):
+    if args.format:
+        return args.format
+    if args.output:
+        extension = os.path.splitext(args.output)[1].lstrip('.').lower()
+        if extension in OUTPUT_FORMATS:
+            return extension
+    return 'csv'
+
+
+def build_model(args, x_future=2025):
+    # Повідомлення завантажувача йдуть у stderr, щоб не змішуватися з CSV у stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.source:
+            data = preprocesing.process_data(dataset_loading.load_dataset(source=args.source), compact=args.compact)
+        else:
+            data = data_provider.get_processed_data(compact=args.compact)
+    return PolynomialExtrapolationModel(data, x_future=x_future, degree=args.degree, method=args.method)
+
+
+def refit_incremental(model, path):
+    """
+    Refits model against the state saved at path and saves the new state.
+
+    Returns:
+        tuple: (incremental.Changes, data signature of the data the saved state was
+        fitted on), or (None, None) when there was no usable state and everything was fitted.
+    """
+    state = incremental.FitState.load(path) if os.path.exists(path) else None
+    changes = None
+    base_signature = None
+    if state is not None and state.compatible(model.method, model.degree):
+        base_signature = data_signature(state)
+        changes = model.refit_incremental(state)
+        print(f"Incremental refit: {changes.summary()}", file=sys.stderr)
+    else:
+        print(f"No compatible fit state in {path}, fitting all rows", file=sys.stderr)
+    model.fit_state().save(path)
+    return changes, base_signature
+
+
+def run_forecast(model, args, years):
+
+    if len(years) == 1:
+        results = model.model(calculate_error=args.calculate_error)
+        if args.interval:
+            method = 'bootstrap' if args.bootstrap else 'analytic'
+            intervals = model.prediction_intervals(level=args.interval, method=method, n_boot=args.bootstrap or 0, workers=args.workers)
+            results['Lower Bound'] = intervals['Lower Bound'].to_numpy()
+            results['Upper Bound'] = intervals['Upper Bound'].to_numpy()
+        if args.countries:
+            results = results[results['Country/Territory'].isin(args.countries)].reset_index(drop=True)
+        return results
+
+    dtype = np.float32 if args.float32 else np.float64
+    grid = model.forecast_grid(years, countries=args.countries, dtype=dtype)
+    grid.columns = [str(year) for year in grid.columns]
+    return grid.reset_index()
+
+
+def write_results(results, path, fmt):
+    if fmt == 'parquet':
+        results.to_parquet(path, index=False)
+    elif fmt == 'json':
+        results.to_json(path if path else sys.stdout, orient='records', force_ascii=False, indent=1)
+    else:
+        results.to_csv(path if path else sys.stdout, index=False)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.instrument and not instrumentation.enabled():
+        instrumentation.enable()
+
+    with instrumentation.run('batch'):
+        status = run_batch(parser, args)
+
+    if args.instrument:
+        instrumentation.dump(args.instrument)
+        print(f"Timings written to {args.instrument}", file=sys.stderr)
+    return status
+
+
+def run_batch(parser, args):
+    years = parse_years(args.years)
+    fmt = output_format(args)
+
+    if args.stream:
+        if not args.source or not args.output or fmt != 'csv' or len(years) != 1 or args.countries:
+            parser.error('--stream needs --source, a CSV --output and a single year, without --countries')
+        rows = streaming.write_forecasts(args.source, args.output, x_future=years[0], degree=args.degree,
+                                         calculate_error=args.calculate_error, chunksize=args.stream, method=args.method)
+        print(f"Written {rows} rows to {args.output}", file=sys.stderr)
+        return 0
+
+    if args.interval is not None and not 0 < args.interval < 1:
+        parser.error('--interval must be between 0 and 1')
+    if args.interval and args.method != 'polynomial':
+        parser.error('--interval is only available for the polynomial method')
+    if args.interval and len(years) != 1:
+        parser.error('--interval needs a single year')
+
+    if fmt == 'parquet' and not args.output:
+        parser.error('parquet output needs --output')
+
+    with instrumentation.span('cli.load_data'):
+        model = build_model(args, years[0])
+
+    changes = base_signature = None
+    if args.incremental:
+        with instrumentation.span('cli.incremental_refit'):
+            changes, base_signature = refit_incremental(model, args.incremental)
+
+    if args.store:
+        dtype = np.float32 if args.float32 else np.float64
+        with instrumentation.span('cli.write_store'):
+            if changes is not None and not changes.layout_changed:
+                store = ForecastStore.update(model, args.store, years, changes.changed_rows, base_signature, dtype=dtype)
+            else:
+                store = ForecastStore.write(model, args.store, years, dtype=dtype)
+        print(f"Written forecast store {args.store} ({len(store.countries)} x {len(store.years)})", file=sys.stderr)
+        if not args.output:
+            return 0
+
+    results = run_forecast(model, args, years)
+    with instrumentation.span('cli.write_results'):
+        write_results(results, args.output, fmt)
+    if args.output:
+        print(f"Written {len(results)} rows to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+from concurrent.futures import ProcessPoolExecutor
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from extrapolation_method import batch_fit
+
+DEFAULT_HOLDOUT_YEARS = (2015, 2020, 2022)
+
+
+def backtest_chunk(years, populations, degrees, holdout_years=DEFAULT_HOLDOUT_YEARS):
+    """
+    Scores polynomial degrees on trailing holdout years for a block of rows.
+
+    For every holdout year the fit uses only the known years before it, so each
+    holdout is a genuine out-of-sample forecast.
+
+    Args:
+        years (list): Known years, one per matrix column.
+        populations (np.ndarray): Matrix of shape (rows, len(years)).
+        degrees (list): Polynomial degrees to score.
+        holdout_years (tuple): Years held out one at a time.
+
+    Returns:
+        np.ndarray: Absolute percentage errors of shape (rows, len(degrees), len(holdout_years));
+        NaN where a degree cannot be fitted or the actual value is missing.
+    """
+    years = np.asarray(years)
+    populations = np.asarray(populations, dtype=np.float64)
+    errors = np.full((populations.shape[0], len(degrees), len(holdout_years)), np.nan)
+
+    for h, holdout in enumerate(holdout_years):
+        train = years < holdout
+        actual = populations[:, np.flatnonzero(years == holdout)[0]]
+        actual = np.where(actual > 0, actual, np.nan)
+        for d, degree in enumerate(degrees):
+            coefficients = batch_fit.fit_polynomials(years[train], populations[:, train], degree)
+            predicted = batch_fit.evaluate_polynomials(coefficients, holdout)
+            errors[:, d, h] = batch_fit.forecast_errors(predicted, actual)[1]
+
+    return errors
+
+
+def backtest_degrees(model, max_degree=3, holdout_years=DEFAULT_HOLDOUT_YEARS, workers=None, chunk_size=5000):
+    """
+    Picks the best polynomial degree for every country by trailing-holdout backtesting.
+
+    Args:
+        model (PolynomialExtrapolationModel): Model whose population matrix is scored.
+        max_degree (int): Degrees 1..max_degree are compared.
+        holdout_years (tuple): Known years held out one at a time.
+        workers (int): Size of the process pool; 1 runs serially, None lets the
+            executor choose.
+        chunk_size (int): Number of countries per task sent to a worker.
+
+    Returns:
+        pd.DataFrame: Mean absolute percentage error per degree, the best degree and its error.
+    """
+    missing = [year for year in holdout_years if year not in model.years_known]
+    if missing:
+        raise ValueError(f"Holdout years {missing} are not among the known years")
+
+    degrees = list(range(1, max_degree + 1))
+    matrix = model.population_matrix
+    chunks = [matrix[start:start + chunk_size] for start in range(0, matrix.shape[0], chunk_size)]
+
+    if workers == 1 or len(chunks) <= 1:
+        parts = [backtest_chunk(model.years_known, chunk, degrees, holdout_years) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(
+                backtest_chunk,
+                [model.years_known] * len(chunks),
+                chunks,
+                [degrees] * len(chunks),
+                [holdout_years] * len(chunks)
+            ))
+
+    if parts:
+        errors = np.concatenate(parts)
+    else:
+        errors = np.empty((0, len(degrees), len(holdout_years)))
+
+    with warnings.catch_warnings():
+        # Рядки без жодної придатної відкладеної точки дають NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        scores = np.nanmean(errors, axis=2)
+
+    results = pd.DataFrame({'Country/Territory': model.df['Country/Territory'].to_numpy()})
+    for d, degree in enumerate(degrees):
+        results[f'MAPE Degree {degree}'] = scores[:, d]
+
+    scored = ~np.all(np.isnan(scores), axis=1)
+    best = np.zeros(scores.shape[0], dtype=np.int64)
+    best[scored] = np.nanargmin(scores[scored], axis=1)
+    results['Best Degree'] = np.where(scored, np.asarray(degrees)[best], np.nan)
+    results['Best MAPE'] = np.where(scored, scores[np.arange(scores.shape[0]), best], np.nan)
+
+    return results
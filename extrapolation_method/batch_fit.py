@@ -0,0 +1,166 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+POPULATION_COLUMN = re.compile(r'^(\d{4}) Population$')
+
+
+def population_years(columns):
+    """Sorted years of the '<year> Population' columns among columns."""
+    matches = (POPULATION_COLUMN.match(str(column)) for column in columns)
+    return sorted(int(match.group(1)) for match in matches if match)
+
+
+def population_matrix(df, years=None):
+    """
+    Builds a (countries x years) float64 matrix from the '<year> Population' columns.
+
+    Args:
+        df (pd.DataFrame): The dataset with one row per country/region.
+        years (list): Years whose population columns are stacked; None uses every
+            population column of df (see population_years).
+
+    Returns:
+        np.ndarray: C-contiguous float64 array of shape (len(df), len(years)).
+    """
+    if years is None:
+        years = population_years(df.columns)
+    columns = [f'{year} Population' for year in years]
+    values = df[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    return np.ascontiguousarray(values)
+
+
+class PopulationHistory:
+    """
+    Array-backed population history consumed by the model.
+
+    Attributes:
+        countries (np.ndarray): Region names, one per row.
+        years (list): Known years, one per column of values.
+        values (np.ndarray): C-contiguous float64 matrix (countries x years).
+        index (dict): Region name -> row position (first occurrence wins).
+    """
+
+    __slots__ = ('countries', 'years', 'values', 'index')
+
+    def __init__(self, countries, years, values):
+        self.countries = np.asarray(countries, dtype=object)
+        self.years = list(years)
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.index = {}
+        for position, country in enumerate(self.countries.tolist()):
+            self.index.setdefault(country, position)
+
+    @classmethod
+    def from_frame(cls, df, years=None):
+        if years is None:
+            years = population_years(df.columns)
+        return cls(df['Country/Territory'].to_numpy(dtype=object), years, population_matrix(df, years))
+
+    def __len__(self):
+        return len(self.countries)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.countries.nbytes
+
+
+def mask_groups(valid):
+    """
+    Groups rows of a boolean (rows x years) mask by identical valid-year patterns.
+
+    Yields:
+        tuple: (mask, row_positions) for every distinct row pattern.
+    """
+    if valid.shape[0] == 0:
+        return
+    patterns, inverse = np.unique(valid, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(patterns) + 1))
+    for group, mask in enumerate(patterns):
+        yield mask, order[bounds[group]:bounds[group + 1]]
+
+
+def fit_polynomials(years, populations, degree, valid=None):
+    """
+    Fits a polynomial of the given degree to every row of a population matrix.
+
+    Only strictly positive values take part in a fit (same rule as the per-country
+    loop), unless an explicit valid mask is given. Rows sharing the same valid-year pattern are solved together in a single
+    least-squares call; rows with fewer than degree + 1 valid points get NaN.
+
+    Args:
+        years (array-like): Known years, one per matrix column.
+        populations (np.ndarray): Matrix of shape (rows, len(years)).
+        degree (int): Polynomial degree.
+        valid (np.ndarray): Optional boolean mask of the cells to fit, same shape as
+            populations (default: populations > 0).
+
+    Returns:
+        np.ndarray: Coefficients of shape (rows, degree + 1), highest power first,
+        compatible with np.polyval.
+    """
+    years = np.asarray(years, dtype=np.float64)
+    populations = np.asarray(populations, dtype=np.float64)
+    coefficients = np.full((populations.shape[0], degree + 1), np.nan)
+
+    if valid is None:
+        valid = populations > 0
+    for mask, rows in mask_groups(np.asarray(valid, dtype=bool)):
+        if mask.sum() < degree + 1:
+            continue
+        try:
+            fitted = np.polyfit(years[mask], populations[np.ix_(rows, mask)].T, degree)
+        except Exception as e:
+            print(f"Помилка polyfit для групи з {len(rows)} рядків: {e}")
+            continue
+        coefficients[rows] = fitted.T
+
+    return coefficients
+
+
+def evaluate_polynomials(coefficients, x):
+    """
+    Evaluates per-row polynomials at one or more points using Horner's scheme.
+
+    Args:
+        coefficients (np.ndarray): Array of shape (rows, degree + 1).
+        x (float or array-like): Evaluation point(s).
+
+    Returns:
+        np.ndarray: Shape (rows,) for a scalar x, otherwise (rows, len(x)).
+    """
+    coefficients = np.asarray(coefficients, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 0:
+        values = np.zeros(coefficients.shape[0])
+        for column in coefficients.T:
+            values = values * x + column
+        return values
+
+    values = np.zeros((coefficients.shape[0], x.size))
+    for column in coefficients.T:
+        values = values * x + column[:, None]
+    return values
+
+
+def forecast_errors(extrapolated, actual):
+    """
+    Vectorized version of the error block used by the per-country forecast.
+
+    Returns:
+        tuple: (absolute_error, percentage_error) arrays.
+    """
+    extrapolated = np.asarray(extrapolated, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    absolute_error = np.abs(extrapolated - actual)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = absolute_error / actual * 100
+    has_actual = ~np.isnan(actual) & (actual != 0)
+    zero_actual = (actual == 0) & ~np.isnan(extrapolated)
+    percentage_error = np.where(has_actual, relative, np.where(zero_actual, np.inf, np.nan))
+
+    return absolute_error, percentage_error
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+import threading
+
+
+class CoefficientCache:
+    """
+    LRU cache for fitted polynomial coefficients.
+
+    Keys are (country, degree, data_version) tuples; the model uses ALL_COUNTRIES as the
+    country for the coefficient matrix of the whole dataset.
+    """
+
+    ALL_COUNTRIES = '__all__'
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def peek(self, key):
+        """Returns an entry without touching the LRU order or the counters."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key, coefficients):
+        with self._lock:
+            self._entries[key] = coefficients
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize
+            }
@@ -1,35 +1,30 @@
 import numpy as np
 import pandas as pd
 
+import instrumentation
 
+
+@instrumentation.timed('execute_country_forecast')
 def execute_country_forecast(model):
-    country_row = model.df[model.df['Country/Territory'] == model.test_country]
+    position = model.country_index.get(model.test_country)
 
-    if country_row.empty:
+    if position is None:
         return None, None
 
-    country_row = country_row.iloc[0]
-    years_known = [1970, 1980, 1990, 2000, 2010, 2015, 2020, 2022]
-    population_data = [country_row[f'{year} Population'] for year in years_known]
-
-    valid_years = [years_known[i] for i, pop in enumerate(population_data) if pop > 0]
-    valid_population = [pop for pop in population_data if pop > 0]
+    years_known = np.asarray(model.years_known)
+    population_data = model.population_matrix[position]
+    valid = population_data > 0
 
-    extrapolated_population = np.nan
-    coefficients = None
+    extrapolated_population = None
+    store = model.forecast_store
+    if store is not None and store.meta.get('method') == model.method and store.meta.get('degree') == model.degree:
+        extrapolated_population = store.lookup(model.test_country, model.x_future)
+    if extrapolated_population is None:
+        coefficients = model.fit_coefficients(model.test_country)
+        extrapolated_population = model.predict(coefficients[None, :], model.x_future)[0]
 
-    if len(valid_years) >= model.degree + 1:
-        try:
-            coefficients = np.polyfit(valid_years, valid_population, model.degree)
-            extrapolated_population = np.polyval(coefficients, model.x_future)
-        except Exception as e:
-            print(f"Помилка polyfit для {model.test_country}: {e}")
-            extrapolated_population = np.nan
-    else:
-        extrapolated_population = np.nan
-
-    years_for_plot = valid_years[:]
-    populations_for_plot = valid_population[:]
+    years_for_plot = years_known[valid].tolist()
+    populations_for_plot = population_data[valid].tolist()
 
     years_extended = years_for_plot + [model.x_future]
     populations_extended = populations_for_plot + [extrapolated_population]
@@ -39,8 +34,13 @@ def execute_country_forecast(model):
         'Extrapolated Population': extrapolated_population
     }
 
-    if f'{model.x_future} Population' in country_row:
-        actual = country_row[f'{model.x_future} Population']
+    # Між відомими роками фактичне значення береться з кешованого щорічного ряду
+    actual_column, interpolated = model.actual_populations(model.x_future)
+    actual = None if actual_column is None else actual_column[position]
+    if interpolated:
+        result['Interpolated Actual'] = True
+
+    if actual is not None:
         if not pd.isna(actual) and actual != 0:
             result['Actual Population'] = actual
             result['Absolute Error'] = abs(extrapolated_population - actual) if not pd.isna(extrapolated_population) else np.nan
@@ -50,4 +50,4 @@ def execute_country_forecast(model):
             result['Absolute Error'] = abs(extrapolated_population - actual) if not pd.isna(extrapolated_population) else np.nan
             result['Percentage Error'] = np.inf if actual == 0 and not pd.isna(extrapolated_population) else np.nan
 
-    return result, (years_extended, populations_extended)
\ No newline at end of file
+    return result, (years_extended, populations_extended)
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+STORE_VERSION = 1
+# Стільки країн оцінюється за один крок під час запису, щоб не тримати всю сітку в пам'яті
+WRITE_CHUNK_ROWS = 65_536
+
+
+def data_signature(history):
+    """
+    Hash of a PopulationHistory, used to check that a store matches the loaded data.
+
+    Anything with countries, years and values works, e.g. an incremental.FitState,
+    whose signature is that of the data it was fitted on.
+    """
+    digest = hashlib.sha1()
+    digest.update(np.asarray(history.years, dtype=np.int64).tobytes())
+    digest.update(history.values.tobytes())
+    digest.update('\x1f'.join(str(country) for country in history.countries).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ForecastStore:
+    """
+    Persistent forecast matrix (countries x years) memory-mapped from a .npy file.
+
+    The sidecar '<path>.json' holds the country and year index plus the method, degree
+    and data signature the forecasts were made with. Opening is zero-copy: readers share the
+    file pages, so several processes can use one store without loading it.
+    """
+
+    def __init__(self, path, matrix, countries, years, meta):
+        self.path = path
+        self.matrix = matrix
+        self.countries = countries
+        self.years = years
+        self.meta = meta
+        # Для повторюваних назв перший рядок, як у PopulationHistory.index
+        self.country_index = {}
+        for i, country in enumerate(countries):
+            self.country_index.setdefault(country, i)
+        self.year_index = {year: i for i, year in enumerate(years)}
+
+    @staticmethod
+    def _paths(path):
+        return path + '.npy', path + '.json'
+
+    @classmethod
+    def open(cls, path):
+        matrix_path, index_path = cls._paths(path)
+        with open(index_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported forecast store version {meta.get('version')} in {index_path}")
+        matrix = np.load(matrix_path, mmap_mode='r')
+        return cls(path, matrix, meta['countries'], meta['years'], meta)
+
+    @classmethod
+    def write(cls, model, path, years, dtype=np.float32):
+        """
+        Forecasts every country of model for years and writes the store chunk by chunk.
+
+        Returns:
+            ForecastStore: The freshly written store, opened read-only.
+        """
+        years = [int(year) for year in years]
+        matrix_path, index_path = cls._paths(path)
+        coefficients = model.fit_coefficients()
+        rows = len(model.history)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        tmp_matrix_path = matrix_path + '.tmp'
+        matrix = np.lib.format.open_memmap(tmp_matrix_path, mode='w+', dtype=dtype, shape=(rows, len(years)))
+        for start in range(0, rows, WRITE_CHUNK_ROWS):
+            stop = min(start + WRITE_CHUNK_ROWS, rows)
+            matrix[start:stop] = model.predict(coefficients[start:stop], years)
+        matrix.flush()
+        del matrix
+        os.replace(tmp_matrix_path, matrix_path)
+
+        cls._write_index(index_path, {
+            'version': STORE_VERSION,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'method': model.method,
+            'degree': model.degree,
+            'data_signature': data_signature(model.history),
+            'dtype': np.dtype(dtype).name,
+            'countries': [str(country) for country in model.history.countries],
+            'years': years,
+        })
+
+        return cls.open(path)
+
+    @classmethod
+    def update(cls, model, path, years, rows, base_signature, dtype=np.float32):
+        """
+        Rewrites only the given rows of an existing store in place.
+
+        rows are the rows that changed since the data with signature base_signature;
+        the other rows are only still valid if the store was written from that data.
+        Falls back to write() when there is no store at path, it was written from other
+        data, or its countries, years, method, degree or dtype no longer match.
+
+        Returns:
+            ForecastStore: The updated store, opened read-only.
+        """
+        years = [int(year) for year in years]
+        try:
+            store = cls.open(path)
+        except (OSError, ValueError, KeyError):
+            store = None
+        if (store is None or store.meta.get('data_signature') != base_signature or store.years != years
+                or store.meta.get('method') != model.method or store.meta.get('degree') != model.degree
+                or store.meta.get('dtype') != np.dtype(dtype).name
+                or store.countries != [str(country) for country in model.history.countries]):
+            return cls.write(model, path, years, dtype)
+
+        matrix_path, index_path = cls._paths(path)
+        matrix = np.load(matrix_path, mmap_mode='r+')
+        coefficients = model.fit_coefficients()
+        rows = np.asarray(rows, dtype=np.int64)
+        for start in range(0, len(rows), WRITE_CHUNK_ROWS):
+            chunk = rows[start:start + WRITE_CHUNK_ROWS]
+            matrix[chunk] = model.predict(coefficients[chunk], years)
+        matrix.flush()
+        del matrix
+
+        meta = dict(store.meta)
+        meta.update(created=time.strftime('%Y-%m-%dT%H:%M:%S'), data_signature=data_signature(model.history))
+        cls._write_index(index_path, meta)
+        return cls.open(path)
+
+    @staticmethod
+    def _write_index(index_path, meta):
+        tmp_index_path = index_path + '.tmp'
+        with open(tmp_index_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_index_path, index_path)
+
+    def matches(self, model):
+        """True if the store was written for the model's method, degree and data."""
+        return (self.meta.get('method') == model.method
+                and self.meta.get('degree') == model.degree
+                and self.meta.get('data_signature') == data_signature(model.history))
+
+    def lookup(self, country, year):
+        """Returns the stored forecast, or None if the country or year is not in the store."""
+        row = self.country_index.get(country)
+        column = self.year_index.get(int(year))
+        if row is None or column is None:
+            return None
+        return float(self.matrix[row, column])
+
+    def country_forecasts(self, country):
+        """Returns the stored row (a view into the mapped file) for a country, or None."""
+        row = self.country_index.get(country)
+        return None if row is None else self.matrix[row]
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(np.asarray(self.matrix), index=pd.Index(self.countries, name='Country/Territory'), columns=self.years)
@@ -0,0 +1,279 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from extrapolation_method import methods
+
+STATE_VERSION = 1
+# Фіксовані координати t = (year - REFERENCE_YEAR) / YEAR_SCALE: нові роки не змінюють вже накопичені суми
+REFERENCE_YEAR = 2000.0
+YEAR_SCALE = 50.0
+
+
+def _basis(years, degree):
+    years = np.asarray(years, dtype=np.float64)
+    return np.vander((years - REFERENCE_YEAR) / YEAR_SCALE, degree + 1)
+
+
+def normal_equations(years, populations, degree):
+    """
+    Per-row least-squares sums X'X and X'y over the strictly positive values.
+
+    Returns:
+        tuple: (gram (rows, p, p), moment (rows, p)) with p = degree + 1, in the fixed
+        scaled year coordinates. Sums are additive: a changed or new cell only adds
+        (or subtracts) its own rank-1 term.
+    """
+    populations = np.asarray(populations, dtype=np.float64)
+    basis = _basis(years, degree)
+    weights = (populations > 0).astype(np.float64)
+    values = np.where(weights > 0, populations, 0.0)
+    outer = basis[:, :, None] * basis[:, None, :]
+    gram = np.einsum('rn,npq->rpq', weights, outer)
+    moment = values @ basis
+    return gram, moment
+
+
+def _scaled_to_raw(degree):
+    # Рядок j - коефіцієнти t**(degree - j) як полінома від року (старший степінь першим)
+    p = degree + 1
+    transform = np.zeros((p, p))
+    year_to_t = np.poly1d([1 / YEAR_SCALE, -REFERENCE_YEAR / YEAR_SCALE])
+    for j in range(p):
+        coefficients = (year_to_t ** (degree - j)).coeffs
+        transform[j, p - len(coefficients):] = coefficients
+    return transform
+
+
+def solve_normal_equations(gram, moment, counts, degree):
+    """
+    Solves the per-row normal equations.
+
+    Returns:
+        np.ndarray: Coefficients of shape (rows, degree + 1) in raw years, highest power
+        first (the layout of batch_fit.fit_polynomials); NaN for rows with fewer than
+        degree + 1 valid points.
+    """
+    p = degree + 1
+    fittable = np.asarray(counts) >= p
+    coefficients = np.full((gram.shape[0], p), np.nan)
+    if fittable.any():
+        scaled = np.linalg.solve(gram[fittable], moment[fittable][:, :, None])[:, :, 0]
+        coefficients[fittable] = scaled @ _scaled_to_raw(degree)
+    return coefficients
+
+
+def _align(values, years, target_years):
+    """Reorders matrix columns to target_years; years that are missing become NaN."""
+    aligned = np.full((values.shape[0], len(target_years)), np.nan)
+    positions = {year: i for i, year in enumerate(years)}
+    for j, year in enumerate(target_years):
+        if year in positions:
+            aligned[:, j] = values[:, positions[year]]
+    return aligned
+
+
+class Changes:
+    """
+    Difference between a saved FitState and a new population history.
+
+    Row positions refer to the new history; removed rows are given by name.
+    """
+
+    __slots__ = ('new_rows', 'changed_rows', 'removed_rows', 'new_years', 'removed_years')
+
+    def __init__(self, new_rows, changed_rows, removed_rows, new_years, removed_years):
+        self.new_rows = new_rows
+        self.changed_rows = changed_rows
+        self.removed_rows = removed_rows
+        self.new_years = new_years
+        self.removed_years = removed_years
+
+    @property
+    def affected_rows(self):
+        return np.union1d(self.new_rows, self.changed_rows)
+
+    @property
+    def layout_changed(self):
+        """True if rows or year columns were added or removed (not just values edited)."""
+        return bool(len(self.new_rows) or len(self.removed_rows) or self.new_years or self.removed_years)
+
+    def __bool__(self):
+        return bool(len(self.changed_rows)) or self.layout_changed
+
+    def summary(self):
+        return (f"{len(self.new_rows)} new, {len(self.changed_rows)} changed, {len(self.removed_rows)} removed rows; "
+                f"new years: {self.new_years or '-'}, removed years: {self.removed_years or '-'}")
+
+
+class FitState:
+    """
+    Everything needed to refit a dataset incrementally: the data the fit was made on,
+    the fitted parameters and, for the polynomial method, the per-row normal-equation
+    sums. Saved as one .npz archive.
+    """
+
+    __slots__ = ('countries', 'years', 'values', 'method', 'degree', 'coefficients', 'gram', 'moment')
+
+    def __init__(self, countries, years, values, method, degree, coefficients, gram=None, moment=None):
+        self.countries = np.asarray(countries, dtype=object)
+        self.years = [int(year) for year in years]
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.method = method
+        self.degree = int(degree)
+        self.coefficients = coefficients
+        self.gram = gram
+        self.moment = moment
+
+    @classmethod
+    def from_history(cls, history, method, degree):
+        """Full (non-incremental) fit of a PopulationHistory."""
+        if method == 'polynomial':
+            gram, moment = normal_equations(history.years, history.values, degree)
+            counts = (history.values > 0).sum(axis=1)
+            coefficients = solve_normal_equations(gram, moment, counts, degree)
+            return cls(history.countries, history.years, history.values.copy(), method, degree, coefficients, gram, moment)
+        coefficients = methods.get_method(method).fit(history.years, history.values, degree)
+        return cls(history.countries, history.years, history.values.copy(), method, degree, coefficients)
+
+    def compatible(self, method, degree):
+        return self.method == method and self.degree == degree
+
+    def save(self, path):
+        arrays = {
+            'version': np.array(STATE_VERSION),
+            'countries': np.array([str(country) for country in self.countries.tolist()]),
+            'years': np.asarray(self.years, dtype=np.int64),
+            'values': self.values,
+            'method': np.array(self.method),
+            'degree': np.array(self.degree),
+            'coefficients': self.coefficients,
+        }
+        if self.gram is not None:
+            arrays['gram'] = self.gram
+            arrays['moment'] = self.moment
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns the saved state, or None if the file is missing or from another version."""
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                if int(archive['version']) != STATE_VERSION:
+                    return None
+                return cls(
+                    archive['countries'].astype(object),
+                    archive['years'].tolist(),
+                    archive['values'],
+                    str(archive['method']),
+                    int(archive['degree']),
+                    archive['coefficients'],
+                    archive['gram'] if 'gram' in archive else None,
+                    archive['moment'] if 'moment' in archive else None,
+                )
+        except (OSError, KeyError, ValueError) as e:
+            print(f"[ERROR]: Failed to read incremental state {path}: {e}")
+            return None
+
+
+def _row_positions(state, history):
+    """Row of every history country in state (first occurrence), -1 for new countries."""
+    if len(state.countries) == len(history) and np.array_equal(state.countries, history.countries):
+        return np.arange(len(history), dtype=np.int64)
+    old_index = pd.Index(state.countries)
+    if old_index.is_unique:
+        return old_index.get_indexer(history.countries).astype(np.int64)
+    first = {}
+    for position, country in enumerate(state.countries.tolist()):
+        first.setdefault(country, position)
+    return np.array([first.get(country, -1) for country in history.countries.tolist()], dtype=np.int64)
+
+
+def detect_changes(state, history, old_positions=None):
+    """Compares a saved FitState with a new PopulationHistory, row by row and year by year."""
+    if old_positions is None:
+        old_positions = _row_positions(state, history)
+    shared = np.flatnonzero(old_positions >= 0)
+    new_rows = np.flatnonzero(old_positions < 0)
+    kept = np.zeros(len(state.countries), dtype=bool)
+    kept[old_positions[shared]] = True
+    removed_rows = list(dict.fromkeys(state.countries[~kept].tolist()))
+
+    years = sorted(set(state.years) | set(history.years))
+    old_values = _align(state.values[old_positions[shared]], state.years, years)
+    new_values = _align(history.values[shared], history.years, years)
+    same = (old_values == new_values) | (np.isnan(old_values) & np.isnan(new_values))
+    changed_rows = shared[~same.all(axis=1)]
+
+    return Changes(
+        new_rows=new_rows,
+        changed_rows=changed_rows,
+        removed_rows=removed_rows,
+        new_years=sorted(set(history.years) - set(state.years)),
+        removed_years=sorted(set(state.years) - set(history.years)),
+    )
+
+
+def refit(state, history):
+    """
+    Brings a FitState up to date with a new PopulationHistory, refitting only the rows
+    that are new or have changed values.
+
+    For the polynomial method the normal-equation sums of changed rows are updated with
+    the changed cells only (old contribution subtracted, new one added), so appending a
+    census year is a rank-1 update per row; other methods refit the affected rows.
+
+    Returns:
+        tuple: (new FitState aligned with history, Changes).
+    """
+    old_positions = _row_positions(state, history)
+    changes = detect_changes(state, history, old_positions)
+    shared = old_positions >= 0
+    rows = len(history)
+    degree = state.degree
+    p = degree + 1
+
+    coefficients = np.full((rows, state.coefficients.shape[1]), np.nan)
+    coefficients[shared] = state.coefficients[old_positions[shared]]
+    affected = changes.affected_rows
+
+    if state.method != 'polynomial' or state.gram is None:
+        if len(affected):
+            backend = methods.get_method(state.method)
+            coefficients[affected] = backend.fit(history.years, history.values[affected], degree)
+        new_state = FitState(history.countries, history.years, history.values.copy(), state.method, degree, coefficients)
+        return new_state, changes
+
+    gram = np.zeros((rows, p, p))
+    moment = np.zeros((rows, p))
+    gram[shared] = state.gram[old_positions[shared]]
+    moment[shared] = state.moment[old_positions[shared]]
+
+    changed = changes.changed_rows
+    if len(changed):
+        years = sorted(set(state.years) | set(history.years))
+        old_values = _align(state.values[old_positions[changed]], state.years, years)
+        new_values = _align(history.values[changed], history.years, years)
+        differs = ~((old_values == new_values) | (np.isnan(old_values) & np.isnan(new_values)))
+        # Лише змінені клітинки: старий внесок віднімається, новий додається
+        removed_gram, removed_moment = normal_equations(years, np.where(differs, old_values, np.nan), degree)
+        added_gram, added_moment = normal_equations(years, np.where(differs, new_values, np.nan), degree)
+        gram[changed] += added_gram - removed_gram
+        moment[changed] += added_moment - removed_moment
+
+    if len(changes.new_rows):
+        gram[changes.new_rows], moment[changes.new_rows] = normal_equations(history.years, history.values[changes.new_rows], degree)
+
+    if len(affected):
+        counts = (history.values[affected] > 0).sum(axis=1)
+        coefficients[affected] = solve_normal_equations(gram[affected], moment[affected], counts, degree)
+
+    new_state = FitState(history.countries, history.years, history.values.copy(), state.method, degree, coefficients, gram, moment)
+    return new_state, changes
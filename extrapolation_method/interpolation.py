@@ -0,0 +1,116 @@
+import numpy as np
+
+from extrapolation_method import batch_fit
+
+INTERPOLATION_METHODS = ('pchip', 'linear')
+
+
+def _pchip_slopes(x, y):
+    """
+    Fritsch-Carlson derivatives (as in scipy's PchipInterpolator) for every row of y.
+
+    Args:
+        x (np.ndarray): Strictly increasing knots, shape (n,), n >= 2.
+        y (np.ndarray): Values at the knots, shape (rows, n).
+
+    Returns:
+        np.ndarray: Derivatives at the knots, shape (rows, n).
+    """
+    h = np.diff(x)
+    delta = np.diff(y, axis=1) / h
+    slopes = np.zeros_like(y)
+    if len(x) == 2:
+        slopes[:] = delta
+        return slopes
+
+    # Внутрішні вузли: зважене гармонічне середнє сусідніх нахилів, 0 на екстремумах
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    left, right = delta[:, :-1], delta[:, 1:]
+    monotone = (left * right) > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        interior = (w1 + w2) / (w1 / left + w2 / right)
+    slopes[:, 1:-1] = np.where(monotone, interior, 0.0)
+
+    slopes[:, 0] = _end_slope(h[0], h[1], delta[:, 0], delta[:, 1])
+    slopes[:, -1] = _end_slope(h[-1], h[-2], delta[:, -1], delta[:, -2])
+    return slopes
+
+
+def _end_slope(h0, h1, delta0, delta1):
+    # Одностороння трьохточкова оцінка з обмеженням, що зберігає монотонність
+    slope = ((2 * h0 + h1) * delta0 - h0 * delta1) / (h0 + h1)
+    slope = np.where(np.sign(slope) != np.sign(delta0), 0.0, slope)
+    overshoot = (np.sign(delta0) != np.sign(delta1)) & (np.abs(slope) > np.abs(3 * delta0))
+    return np.where(overshoot, 3 * delta0, slope)
+
+
+def _interpolate_group(x, y, targets, method):
+    """Interpolates rows that share the knots x at targets; NaN outside [x[0], x[-1]]."""
+    values = np.full((y.shape[0], targets.size), np.nan)
+    inside = (targets >= x[0]) & (targets <= x[-1])
+    if len(x) == 1:
+        values[:, inside] = y[:, :1]
+        return values
+
+    t = targets[inside]
+    segment = np.clip(np.searchsorted(x, t, side='right') - 1, 0, len(x) - 2)
+    h = x[segment + 1] - x[segment]
+    s = (t - x[segment]) / h
+    y0, y1 = y[:, segment], y[:, segment + 1]
+
+    if method == 'linear':
+        values[:, inside] = y0 + s * (y1 - y0)
+        return values
+
+    slopes = _pchip_slopes(x, y)
+    d0, d1 = slopes[:, segment], slopes[:, segment + 1]
+    # Базис Ерміта на відрізку
+    h00 = (1 + 2 * s) * (1 - s) ** 2
+    h10 = s * (1 - s) ** 2
+    h01 = s ** 2 * (3 - 2 * s)
+    h11 = s ** 2 * (s - 1)
+    values[:, inside] = h00 * y0 + h10 * h * d0 + h01 * y1 + h11 * h * d1
+    return values
+
+
+def annual_matrix(years, populations, start=None, end=None, method='pchip'):
+    """
+    Interpolates an irregular (countries x known years) matrix to one column per year.
+
+    Only strictly positive values act as knots (the same rule as the fits). Rows
+    sharing a valid-year pattern are interpolated together; years outside a row's
+    first and last valid year are NaN, since this is interpolation, not a forecast.
+    'pchip' is the shape-preserving monotone cubic: it never overshoots the data,
+    so a growing series stays growing between censuses.
+
+    Args:
+        years (list): Known years, one per matrix column, ascending.
+        populations (np.ndarray): Matrix of shape (rows, len(years)).
+        start (int): First output year (default: first known year).
+        end (int): Last output year (default: last known year).
+        method (str): 'pchip' or 'linear'.
+
+    Returns:
+        tuple: (annual_years, matrix) with matrix of shape (rows, len(annual_years)).
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method '{method}', expected one of {INTERPOLATION_METHODS}")
+
+    years = np.asarray(years, dtype=np.float64)
+    populations = np.asarray(populations, dtype=np.float64)
+    if years.size == 0:
+        return np.array([], dtype=np.int64), np.empty((populations.shape[0], 0))
+
+    start = int(years[0]) if start is None else int(start)
+    end = int(years[-1]) if end is None else int(end)
+    annual_years = np.arange(start, end + 1, dtype=np.int64)
+    targets = annual_years.astype(np.float64)
+    matrix = np.full((populations.shape[0], annual_years.size), np.nan)
+
+    for mask, rows in batch_fit.mask_groups(populations > 0):
+        if not mask.any():
+            continue
+        matrix[rows] = _interpolate_group(years[mask], populations[np.ix_(rows, mask)], targets, method)
+
+    return annual_years, matrix
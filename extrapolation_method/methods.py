@@ -0,0 +1,185 @@
+import numpy as np
+
+from extrapolation_method import batch_fit
+
+_registry = {}
+
+
+def register(name):
+    """Class decorator that registers an extrapolation backend under name."""
+    def decorator(cls):
+        cls.name = name
+        _registry[name] = cls()
+        return cls
+    return decorator
+
+
+def get_method(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise ValueError(f"Unknown extrapolation method '{name}', expected one of {available_methods()}") from None
+
+
+def available_methods():
+    return tuple(_registry)
+
+
+class ExtrapolationMethod:
+    """
+    Base class of the backends.
+
+    fit() works on a whole (rows x years) population matrix and returns one parameter
+    row per country (NaN where a row cannot be fitted); predict() evaluates parameter
+    rows at one or more years. A single country is just a one-row matrix, so the
+    all-country and single-country forecasts share the same code path.
+    Only strictly positive populations take part in a fit.
+    """
+
+    name = None
+
+    def fit(self, years, populations, degree):
+        raise NotImplementedError
+
+    def predict(self, params, x):
+        raise NotImplementedError
+
+
+@register('polynomial')
+class PolynomialMethod(ExtrapolationMethod):
+    def fit(self, years, populations, degree):
+        return batch_fit.fit_polynomials(years, populations, degree)
+
+    def predict(self, params, x):
+        return batch_fit.evaluate_polynomials(params, x)
+
+
+@register('exponential')
+class ExponentialMethod(ExtrapolationMethod):
+    """Constant growth rate: a straight line through log(population)."""
+
+    def fit(self, years, populations, degree=None):
+        populations = np.asarray(populations, dtype=np.float64)
+        valid = populations > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logs = np.where(valid, np.log(populations), np.nan)
+        # Маска за початковими значеннями: логарифми <= 0 (населення <= 1) теж допустимі
+        return batch_fit.fit_polynomials(years, logs, 1, valid=valid)
+
+    def predict(self, params, x):
+        with np.errstate(over='ignore'):
+            return np.exp(batch_fit.evaluate_polynomials(params, x))
+
+
+@register('logistic')
+class LogisticMethod(ExtrapolationMethod):
+    """
+    Saturating growth P(t) = K / (1 + exp(-(a + b * (t - REFERENCE_YEAR)))).
+
+    For a fixed capacity K the logit log(P / (K - P)) is linear in t, so every
+    candidate K from a grid of multiples of the row maximum is a weighted linear fit
+    done for all rows at once; each row keeps the K with the smallest squared error,
+    which a finer per-row grid around it then refines.
+    """
+
+    REFERENCE_YEAR = 2000
+    CAPACITY_MULTIPLIERS = np.geomspace(1.005, 20.0, 64)
+    # Другий прохід уточнює K у межах одного кроку грубої сітки навколо найкращого значення
+    REFINE_STEPS = 33
+    MIN_POINTS = 3
+
+    def fit(self, years, populations, degree=None):
+        t = np.asarray(years, dtype=np.float64) - self.REFERENCE_YEAR
+        populations = np.asarray(populations, dtype=np.float64)
+        valid = populations > 0
+        weights = valid.astype(np.float64)
+        values = np.where(valid, populations, 0.0)
+
+        n = weights.sum(axis=1)
+        sum_t = weights @ t
+        denominator = n * (weights @ (t * t)) - sum_t ** 2
+        peak = values.max(axis=1)
+
+        params = np.full((populations.shape[0], 3), np.nan)
+        best_error = np.full(populations.shape[0], np.inf)
+        best_multiplier = np.full(populations.shape[0], np.nan)
+        fittable = (n >= self.MIN_POINTS) & (denominator > 0)
+
+        def try_capacity(multiplier):
+            # Для фіксованого K логіт лінійний за t: зважена МНК-пряма для всіх рядків одразу
+            capacity = peak * multiplier
+            logit = np.where(valid, np.log(values / (capacity[:, None] - values)), 0.0)
+            sum_z = (weights * logit).sum(axis=1)
+            sum_tz = (weights * logit) @ t
+            slope = (n * sum_tz - sum_t * sum_z) / denominator
+            intercept = (sum_z - slope * sum_t) / n
+
+            fitted = capacity[:, None] / (1 + np.exp(-(intercept[:, None] + slope[:, None] * t)))
+            error = (weights * (fitted - values) ** 2).sum(axis=1)
+
+            better = fittable & (error < best_error)
+            best_error[better] = error[better]
+            best_multiplier[better] = np.broadcast_to(multiplier, better.shape)[better]
+            params[better] = np.column_stack((capacity, intercept, slope))[better]
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            for multiplier in self.CAPACITY_MULTIPLIERS:
+                try_capacity(multiplier)
+            step = self.CAPACITY_MULTIPLIERS[1] / self.CAPACITY_MULTIPLIERS[0]
+            centre = best_multiplier.copy()
+            for factor in np.geomspace(1 / step, step, self.REFINE_STEPS):
+                # Множник K має лишатися більшим за 1, інакше логіт не визначений
+                try_capacity(np.maximum(centre * factor, 1.0001))
+
+        return params
+
+    def predict(self, params, x):
+        params = np.asarray(params, dtype=np.float64)
+        capacity, intercept, slope = (params[:, i] for i in range(3))
+        x = np.asarray(x, dtype=np.float64)
+        with np.errstate(over='ignore'):
+            if x.ndim == 0:
+                return capacity / (1 + np.exp(-(intercept + slope * (x - self.REFERENCE_YEAR))))
+            t = x.ravel() - self.REFERENCE_YEAR
+            return capacity[:, None] / (1 + np.exp(-(intercept[:, None] + slope[:, None] * t)))
+
+
+@register('piecewise')
+class PiecewiseLinearMethod(ExtrapolationMethod):
+    """
+    Continuous piecewise-linear trend with breakpoints at KNOTS.
+
+    The trend is linear in the basis [1, t, max(t - knot, 0), ...], so rows sharing a
+    valid-year pattern are solved together by one least-squares call. Forecasts follow
+    the slope of the most recent segment.
+    """
+
+    KNOTS = (1990, 2010)
+
+    def _basis(self, x):
+        x = np.asarray(x, dtype=np.float64).ravel()
+        columns = [np.ones_like(x), x - self.KNOTS[0]]
+        columns.extend(np.maximum(x - knot, 0.0) for knot in self.KNOTS)
+        return np.column_stack(columns)
+
+    def fit(self, years, populations, degree=None):
+        years = np.asarray(years, dtype=np.float64)
+        populations = np.asarray(populations, dtype=np.float64)
+        basis = self._basis(years)
+        params = np.full((populations.shape[0], basis.shape[1]), np.nan)
+
+        for mask, rows in batch_fit.mask_groups(populations > 0):
+            group_basis = basis[mask]
+            # Сегмент без жодної точки не визначений, тож такі групи не підганяються
+            if np.linalg.matrix_rank(group_basis) < basis.shape[1]:
+                continue
+            solution = np.linalg.lstsq(group_basis, populations[np.ix_(rows, mask)].T, rcond=None)[0]
+            params[rows] = solution.T
+
+        return params
+
+    def predict(self, params, x):
+        values = np.asarray(params, dtype=np.float64) @ self._basis(x).T
+        if np.ndim(x) == 0:
+            return values[:, 0]
+        return values
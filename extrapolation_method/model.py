@@ -1,57 +1,308 @@
+import itertools
+
 import numpy as np
 import pandas as pd
 
-from data_processing import preprocesing
+import instrumentation
+from data_processing import data_provider
+from extrapolation_method import batch_fit
+from extrapolation_method import incremental
+from extrapolation_method import interpolation
+from extrapolation_method import methods
+from extrapolation_method import uncertainty
+from extrapolation_method.coefficient_cache import CoefficientCache
+
+_data_versions = itertools.count(1)
+# Назва стовпця статистики для року між переписами: '<year> Population (interpolated)'
+INTERPOLATED_SUFFIX = ' (interpolated)'
+
 
 class PolynomialExtrapolationModel:
-    def __init__(self, data=preprocesing.process_data(), x_future=2025, degree=2, test_year=2022, test_country="Ukraine"):
+    def __init__(self, data=None, x_future=2025, degree=2, test_year=2022, test_country="Ukraine", method='polynomial'):
+        methods.get_method(method)
+        if data is None:
+            data = data_provider.get_processed_data()
+        self.coefficient_cache = CoefficientCache()
+        self.forecast_store = None
         self.df = data
         self.x_future = x_future
         self.degree = degree
+        self.method = method
         self.test_year = test_year
         self.test_country = test_country
         self.results = []
 
-    def model(self, calculate_error=False):
-        years = [1970, 1980, 1990, 2000, 2010, 2015, 2020, 2022]
-        results_list = []
+    @property
+    def df(self):
+        return self._df
+
+    @df.setter
+    def df(self, data):
+        # Індекс країн і матриця населення будуються один раз при завантаженні даних;
+        # відомі роки беруться зі стовпців '<year> Population' самого датасету
+        self._df = data
+        self.history = batch_fit.PopulationHistory.from_frame(data)
+        self.years_known = self.history.years
+        self.population_matrix = self.history.values
+        self.country_index = self.history.index
+        # Нова версія даних робить недійсними всі збережені коефіцієнти
+        self.data_version = next(_data_versions)
+        self.coefficient_cache.clear()
+        self.forecast_store = None
+        self._annual = {}
+        self._fit_state = None
+
+    def reload_data(self):
+        """Reloads the dataset through the data provider and invalidates cached fits."""
+        data_provider.reload()
+        self.df = data_provider.get_processed_data()
+
+    def fit_state(self):
+        """FitState of the current data: kept from the last incremental refit, otherwise a full fit."""
+        state = self._fit_state
+        if state is None or not state.compatible(self.method, self.degree):
+            state = incremental.FitState.from_history(self.history, self.method, self.degree)
+            self._fit_state = state
+        return state
+
+    def refit_incremental(self, state):
+        """
+        Fits the current data starting from the FitState of an earlier version of it.
+
+        Only countries that are new or whose populations changed are refitted; the result
+        seeds the coefficient cache, so model() and forecast_grid() do not refit.
+
+        Args:
+            state (incremental.FitState): State saved for the earlier data with the same
+                method and degree.
+
+        Returns:
+            incremental.Changes: What differed between the two datasets.
+        """
+        if not state.compatible(self.method, self.degree):
+            raise ValueError(f"Fit state is for method '{state.method}', degree {state.degree}")
+        new_state, changes = incremental.refit(state, self.history)
+        self._fit_state = new_state
+        self.coefficient_cache.put((CoefficientCache.ALL_COUNTRIES, self.method, self.degree, self.data_version), new_state.coefficients)
+        return changes
 
-        for index, row in self.df.iterrows():
-            population_data = [row[f'{year} Population'] for year in years]
+    def update_data(self, data):
+        """Replaces the dataset, refitting only the countries that changed (see refit_incremental)."""
+        state = self.fit_state()
+        self.df = data
+        return self.refit_incremental(state)
+
+    @property
+    def backend(self):
+        """The registered extrapolation backend selected by self.method."""
+        return methods.get_method(self.method)
+
+    def predict(self, params, x):
+        """Evaluates parameter rows from fit_coefficients at year(s) x."""
+        return self.backend.predict(params, x)
+
+    def attach_forecast_store(self, store):
+        """
+        Serves single-country forecasts from a precomputed ForecastStore.
+
+        The store is only attached if it was written for this method, degree and dataset;
+        it is detached again whenever the data is replaced.
+
+        Returns:
+            bool: True if the store was attached.
+        """
+        if not store.matches(self):
+            return False
+        self.forecast_store = store
+        return True
 
-            valid_years = [years[i] for i, pop in enumerate(population_data) if pop > 0]
-            valid_population = [pop for pop in population_data if pop > 0]
+    def fit_coefficients(self, country=None):
+        """
+        Returns cached fit parameters for the current method, degree and data version.
 
-            extrapolated_population = np.nan
-            coefficients = None
+        Args:
+            country (str): Country to fit; None returns the parameter matrix (one row per
+                country) for the whole dataset.
 
-            if len(valid_years) >= self.degree + 1:
-                try:
-                    coefficients = np.polyfit(valid_years, valid_population, self.degree)
-                    extrapolated_population = np.polyval(coefficients, self.x_future)
-                except Exception as e:
-                    print(f"Помилка polyfit для {row['Country/Territory']}: {e}")
-                    extrapolated_population = np.nan
+        Returns:
+            np.ndarray: Parameters of the selected method (polynomial coefficients are
+            highest power first), or None for an unknown country.
+        """
+        cache = self.coefficient_cache
+        backend = self.backend
+        if country is None:
+            key = (CoefficientCache.ALL_COUNTRIES, self.method, self.degree, self.data_version)
+            coefficients = cache.get(key)
+            if coefficients is None:
+                with instrumentation.span(f'model.fit.{self.method}'):
+                    coefficients = backend.fit(self.years_known, self.population_matrix, self.degree)
+                cache.put(key, coefficients)
+            return coefficients
+
+        position = self.country_index.get(country)
+        if position is None:
+            return None
+
+        key = (country, self.method, self.degree, self.data_version)
+        coefficients = cache.get(key)
+        if coefficients is None:
+            all_coefficients = cache.peek((CoefficientCache.ALL_COUNTRIES, self.method, self.degree, self.data_version))
+            if all_coefficients is not None:
+                coefficients = all_coefficients[position]
             else:
-                extrapolated_population = np.nan
-
-            result = {
-                'Country/Territory': row['Country/Territory'],
-                'Extrapolated Population': extrapolated_population
-            }
-
-            if calculate_error and f'{self.x_future} Population' in row:
-                actual = row[f'{self.x_future} Population']
-                if not pd.isna(actual) and actual != 0:
-                    result['Actual Population'] = actual
-                    result['Absolute Error'] = abs(extrapolated_population - actual) if not pd.isna(extrapolated_population) else np.nan
-                    result['Percentage Error'] = (abs(extrapolated_population - actual) / actual * 100) if not pd.isna(extrapolated_population) and not pd.isna(actual) else np.nan
-                else:
-                    result['Actual Population'] = actual
-                    result['Absolute Error'] = abs(extrapolated_population - actual) if not pd.isna(extrapolated_population) else np.nan
-                    result['Percentage Error'] = np.inf if actual == 0 and not pd.isna(extrapolated_population) else np.nan
-
-            results_list.append(result)
-
-        self.results = results_list
-        return pd.DataFrame(self.results)
\ No newline at end of file
+                coefficients = backend.fit(self.years_known, self.population_matrix[position][None, :], self.degree)[0]
+            cache.put(key, coefficients)
+        return coefficients
+
+    def annual_populations(self, method='pchip'):
+        """
+        Annual population series between the first and last known year for every country.
+
+        Built once per data version with interpolation.annual_matrix and reused by
+        later calls: actual values between censuses (actual_populations, used by
+        model(), execute_country_forecast and the service), the country plot
+        (annual_series) and column statistics (interpolated_column).
+
+        Returns:
+            tuple: (annual_years, matrix) with one row per country; NaN outside a
+            country's own first and last known year.
+        """
+        annual = self._annual.get(method)
+        if annual is None:
+            annual = interpolation.annual_matrix(self.years_known, self.population_matrix, method=method)
+            annual[1].flags.writeable = False
+            self._annual[method] = annual
+        return annual
+
+    def actual_populations(self, year, method='pchip'):
+        """
+        Actual population of every country in year.
+
+        A census year reads its dataset column; a year between the first and last known
+        year reads the annual series.
+
+        Returns:
+            tuple: (values of shape (rows,), or None outside the known years; True if
+            the values are interpolated)
+        """
+        if year in self.years_known:
+            return self.population_matrix[:, self.years_known.index(year)], False
+        if self.years_known and self.years_known[0] < year < self.years_known[-1]:
+            annual_years, matrix = self.annual_populations(method)
+            return matrix[:, year - annual_years[0]], True
+        return None, False
+
+    def annual_series(self, country, method='pchip'):
+        """(years, populations) of a country's annual series; empty arrays for an unknown country."""
+        annual_years, matrix = self.annual_populations(method)
+        position = self.country_index.get(country)
+        if position is None:
+            return annual_years[:0], matrix[:0, :0].ravel()
+        row = matrix[position]
+        inside = ~np.isnan(row)
+        return annual_years[inside], row[inside]
+
+    def interpolated_columns(self):
+        """Statistics column names of the years between censuses, e.g. '2005 Population (interpolated)'."""
+        if not self.years_known:
+            return []
+        known = set(self.years_known)
+        return [f'{year} Population{INTERPOLATED_SUFFIX}'
+                for year in range(self.years_known[0], self.years_known[-1] + 1) if year not in known]
+
+    def interpolated_column(self, column_name, method='pchip'):
+        """Values of a column named as in interpolated_columns(); None for any other name."""
+        if not column_name.endswith(INTERPOLATED_SUFFIX):
+            return None
+        years = batch_fit.population_years([column_name[:-len(INTERPOLATED_SUFFIX)]])
+        if not years:
+            return None
+        values, interpolated = self.actual_populations(years[0], method)
+        return values if interpolated else None
+
+    def annual_frame(self, method='pchip'):
+        """annual_populations() as a DataFrame indexed by 'Country/Territory' with one column per year."""
+        annual_years, matrix = self.annual_populations(method)
+        return pd.DataFrame(matrix, index=pd.Index(self.history.countries, name='Country/Territory'), columns=annual_years)
+
+    @instrumentation.timed('model.forecast_grid')
+    def forecast_grid(self, years, countries=None, dtype=np.float64, as_frame=True):
+        """
+        Forecasts every country for every target year in one vectorized evaluation.
+
+        Args:
+            years (array-like): Target years, e.g. range(1970, 2071).
+            countries (list): Optional subset of countries; unknown names are skipped.
+            dtype: Output dtype; np.float32 halves the memory of large grids.
+            as_frame (bool): Return a DataFrame (countries x years) instead of raw arrays.
+
+        Returns:
+            pd.DataFrame, or a tuple (grid, countries, years) when as_frame is False.
+        """
+        years = np.asarray(years, dtype=np.int64).ravel()
+        coefficients = self.fit_coefficients()
+
+        if countries is None:
+            positions = np.arange(len(self.history))
+            names = self.history.countries
+        else:
+            positions = np.array([self.country_index[c] for c in countries if c in self.country_index], dtype=np.int64)
+            names = np.array([c for c in countries if c in self.country_index], dtype=object)
+
+        grid = self.predict(coefficients[positions], years).astype(dtype, copy=False)
+
+        if not as_frame:
+            return grid, names, years
+        return pd.DataFrame(grid, index=pd.Index(names, name='Country/Territory'), columns=years)
+
+    @instrumentation.timed('model.model')
+    def model(self, calculate_error=False):
+        coefficients = self.fit_coefficients()
+        extrapolated = self.predict(coefficients, self.x_future)
+
+        results = pd.DataFrame({
+            'Country/Territory': self.history.countries,
+            'Extrapolated Population': extrapolated
+        })
+
+        if calculate_error:
+            # Між відомими роками фактичне значення береться з кешованого щорічного ряду
+            actual, interpolated = self.actual_populations(self.x_future)
+            if actual is not None:
+                absolute_error, percentage_error = batch_fit.forecast_errors(extrapolated, actual)
+                results['Actual Population'] = actual
+                results['Absolute Error'] = absolute_error
+                results['Percentage Error'] = percentage_error
+                if interpolated:
+                    results['Interpolated Actual'] = True
+
+        self.results = results
+        return results
+
+    def prediction_intervals(self, level=0.95, method='analytic', n_boot=1000, seed=None, workers=1):
+        """
+        Forecasts x_future for every country together with a prediction interval.
+
+        Args:
+            level (float): Interval coverage, e.g. 0.95.
+            method (str): 'analytic' (t interval from the fit residuals) or 'bootstrap'
+                (residual resampling).
+            n_boot (int): Number of bootstrap resamples.
+            seed (int): Seed for the bootstrap.
+            workers (int): Process pool size for the bootstrap; 1 runs serially.
+
+        Returns:
+            pd.DataFrame: 'Country/Territory', 'Extrapolated Population', 'Lower Bound', 'Upper Bound'.
+        """
+        if self.method != 'polynomial':
+            raise ValueError(f"Prediction intervals are only available for the polynomial method, not '{self.method}'")
+        estimate, lower, upper = uncertainty.prediction_intervals(
+            self.years_known, self.population_matrix, self.degree, self.x_future,
+            level=level, method=method, n_boot=n_boot, seed=seed, workers=workers
+        )
+        return pd.DataFrame({
+            'Country/Territory': self.history.countries,
+            'Extrapolated Population': estimate,
+            'Lower Bound': lower,
+            'Upper Bound': upper
+        })
@@ -0,0 +1,358 @@
+"""
+Local forecast service: HTTP/JSON over asyncio, standard library only.
+
+The dataset is loaded and fitted once at start-up and stays warm in memory.
+Concurrent single-country requests are collected for a few milliseconds and answered
+with one vectorized forecast_grid call.
+
+Usage:
+    python -m extrapolation_method.service --port 8765
+
+Endpoints:
+    GET  /forecast?country=Ukraine&year=2030
+    POST /forecast/batch        {"countries": ["Ukraine", "Poland"], "year": 2030}
+    GET  /forecast/grid?countries=Ukraine,Poland&start=2023&end=2070
+    GET  /stats                 latency percentiles, batch sizes, fit cache counters
+    GET  /health
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import json
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from extrapolation_method import methods
+from extrapolation_method.__main__ import build_model
+
+DEFAULT_PORT = 8765
+# Скільки чекати на сусідні запити перед спільним обчисленням
+BATCH_WINDOW_MS = 2.0
+MAX_BATCH_SIZE = 4096
+MAX_GRID_CELLS = 5_000_000
+LATENCY_SAMPLES = 10_000
+MAX_BODY_BYTES = 1 << 20
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyRecorder:
+    """Keeps the most recent request durations per endpoint and reports percentiles."""
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=samples))
+        self._counts = collections.Counter()
+
+    def record(self, endpoint, seconds):
+        self._samples[endpoint].append(seconds)
+        self._counts[endpoint] += 1
+
+    def summary(self):
+        summary = {}
+        for endpoint, samples in self._samples.items():
+            values = np.fromiter(samples, dtype=np.float64) * 1000
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            summary[endpoint] = {
+                'requests': self._counts[endpoint],
+                'p50_ms': round(float(p50), 3),
+                'p90_ms': round(float(p90), 3),
+                'p99_ms': round(float(p99), 3),
+                'max_ms': round(float(values.max()), 3),
+            }
+        return summary
+
+
+class ForecastBatcher:
+    """
+    Coalesces concurrent (country, year) lookups into one forecast_grid call.
+
+    Requests wait at most window_ms for neighbours; the grid is computed in a worker
+    thread so the event loop keeps accepting connections meanwhile.
+    """
+
+    def __init__(self, model, model_lock, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH_SIZE):
+        self.model = model
+        self.model_lock = model_lock
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []
+        self._flush_handle = None
+        # asyncio тримає лише слабкі посилання на задачі: запущені скидання зберігаються тут
+        self._flush_tasks = set()
+        self.batch_sizes = collections.deque(maxlen=LATENCY_SAMPLES)
+
+    async def forecast(self, country, year):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((country, year, future))
+        if len(self._pending) >= self.max_batch:
+            self._schedule(0)
+        elif self._flush_handle is None:
+            self._schedule(self.window)
+        return await future
+
+    def _schedule(self, delay):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        task = asyncio.get_running_loop().create_task(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task):
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[ERROR]: Forecast batch failed: {task.exception()!r}", file=sys.stderr)
+
+    async def _flush(self):
+        self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batch_sizes.append(len(batch))
+
+        countries = list(dict.fromkeys(country for country, _, _ in batch))
+        years = sorted({year for _, year, _ in batch})
+        try:
+            async with self.model_lock:
+                grid, names, _ = await asyncio.to_thread(self.model.forecast_grid, years, countries, np.float64, False)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        rows = {name: i for i, name in enumerate(names.tolist())}
+        columns = {year: j for j, year in enumerate(years)}
+        for country, year, future in batch:
+            if future.done():
+                continue
+            row = rows.get(country)
+            future.set_result(None if row is None else float(grid[row, columns[year]]))
+
+
+class ForecastService:
+    """Routes HTTP requests to the warm model."""
+
+    def __init__(self, model, window_ms=BATCH_WINDOW_MS):
+        self.model = model
+        # Модель обчислює по одній сітці за раз, щоб не дублювати підгонку в кількох потоках
+        self.model_lock = asyncio.Lock()
+        self.batcher = ForecastBatcher(model, self.model_lock, window_ms)
+        self.latency = LatencyRecorder()
+        self.started = time.time()
+        self.routes = {
+            ('GET', '/forecast'): self.single,
+            ('POST', '/forecast/batch'): self.batch,
+            ('GET', '/forecast/grid'): self.grid,
+            ('GET', '/stats'): self.stats,
+            ('GET', '/health'): self.health,
+        }
+
+    def warm_up(self):
+        """Fits every country once so the first requests hit the coefficient cache."""
+        self.model.fit_coefficients()
+
+    @staticmethod
+    def _year(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise RequestError(400, f"Invalid year: {value!r}") from None
+
+    def _actual(self, country, year):
+        """(actual population or None, True if interpolated between censuses)"""
+        position = self.model.country_index.get(country)
+        actual, interpolated = self.model.actual_populations(year) if position is not None else (None, False)
+        if actual is None or np.isnan(actual[position]):
+            return None, False
+        return float(actual[position]), interpolated
+
+    @staticmethod
+    def _number(value):
+        # JSON не має NaN: непридатні прогнози повертаються як null
+        return None if value is None or not np.isfinite(value) else value
+
+    async def single(self, query, body):
+        country = query.get('country')
+        if not country:
+            raise RequestError(400, "Parameter 'country' is required")
+        year = self._year(query.get('year', self.model.x_future))
+        if country not in self.model.country_index:
+            raise RequestError(404, f"Unknown country: {country}")
+        forecast = await self.batcher.forecast(country, year)
+        actual, interpolated = self._actual(country, year)
+        return {'country': country, 'year': year, 'method': self.model.method,
+                'forecast': self._number(forecast), 'actual': actual, 'actual_interpolated': interpolated}
+
+    async def batch(self, query, body):
+        countries = body.get('countries')
+        if not isinstance(countries, list) or not countries:
+            raise RequestError(400, "Field 'countries' must be a non-empty list")
+        year = self._year(body.get('year', self.model.x_future))
+        forecasts = await asyncio.gather(*(self.batcher.forecast(str(country), year) for country in countries))
+        return {'year': year, 'method': self.model.method, 'forecasts': [
+            {'country': country, 'forecast': self._number(forecast), 'known': str(country) in self.model.country_index}
+            for country, forecast in zip(countries, forecasts)
+        ]}
+
+    async def grid(self, query, body):
+        start = self._year(query.get('start', self.model.x_future))
+        end = self._year(query.get('end', start))
+        if end < start:
+            raise RequestError(400, "'end' must not be before 'start'")
+        countries = query.get('countries')
+        countries = [c for c in countries.split(',') if c] if countries else None
+        rows = len(countries) if countries else len(self.model.history)
+        if rows * (end - start + 1) > MAX_GRID_CELLS:
+            raise RequestError(400, f"Grid is larger than {MAX_GRID_CELLS} cells; narrow countries or years")
+
+        years = list(range(start, end + 1))
+        async with self.model_lock:
+            grid, names, _ = await asyncio.to_thread(self.model.forecast_grid, years, countries, np.float64, False)
+        return {'years': years, 'method': self.model.method, 'countries': names.tolist(),
+                'forecasts': [[self._number(v) for v in row] for row in grid.tolist()]}
+
+    async def stats(self, query, body):
+        sizes = np.fromiter(self.batcher.batch_sizes, dtype=np.float64)
+        return {
+            'uptime_s': round(time.time() - self.started, 1),
+            'latency': self.latency.summary(),
+            'batches': {
+                'count': int(sizes.size),
+                'mean_size': round(float(sizes.mean()), 2) if sizes.size else 0,
+                'max_size': int(sizes.max()) if sizes.size else 0,
+            },
+            'coefficient_cache': self.model.coefficient_cache.info(),
+        }
+
+    async def health(self, query, body):
+        return {'status': 'ok', 'countries': len(self.model.history), 'data_version': self.model.data_version}
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.routes):
+                raise RequestError(405, f"Method {method} not allowed for {url.path}")
+            raise RequestError(404, f"Unknown endpoint: {url.path}")
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if method == 'POST':
+            try:
+                body = json.loads(body or b'{}')
+            except ValueError:
+                raise RequestError(400, 'Body must be JSON') from None
+            if not isinstance(body, dict):
+                raise RequestError(400, 'Body must be a JSON object')
+        return url.path, await handler(query, body)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                started = time.perf_counter()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                endpoint = None
+                try:
+                    parts = request_line.decode('latin-1').split()
+                    if len(parts) != 3:
+                        raise RequestError(400, 'Malformed request line')
+                    method, target, version = parts
+                    length = self._content_length(headers)
+                    if length > MAX_BODY_BYTES:
+                        raise RequestError(413, 'Request body is too large')
+                    body = await reader.readexactly(length) if length else b''
+                    endpoint, payload = await self.dispatch(method, target, body)
+                    status = 200
+                except RequestError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and request_line.rstrip().endswith(b'HTTP/1.1')
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if endpoint is not None:
+                    self.latency.record(endpoint, time.perf_counter() - started)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    @staticmethod
+    def _content_length(headers):
+        value = headers.get('content-length', '0')
+        # int() прийняв би також '+5', ' 5' чи '5_0', тому лише десяткові цифри
+        if not value.isascii() or not value.isdigit():
+            raise RequestError(400, f"Invalid Content-Length: {value!r}")
+        return int(value)
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+
+
+async def serve(model, host='127.0.0.1', port=DEFAULT_PORT, window_ms=BATCH_WINDOW_MS):
+    service = ForecastService(model, window_ms)
+    await asyncio.to_thread(service.warm_up)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Forecast service listening on http://{host}:{port} ({len(model.history)} regions, method {model.method})", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m extrapolation_method.service', description='Local HTTP/JSON forecast service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--source', help='CSV file to use instead of the Kaggle dataset')
+    parser.add_argument('--method', choices=methods.available_methods(), default='polynomial', help='Extrapolation method')
+    parser.add_argument('--degree', type=int, default=2, help='Polynomial degree (polynomial method only)')
+    parser.add_argument('--compact', action='store_true', help='Use categorical/downcast dtypes for the loaded dataset')
+    parser.add_argument('--batch-window-ms', type=float, default=BATCH_WINDOW_MS, help='How long single requests wait to be batched')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    model = build_model(args)
+    try:
+        asyncio.run(serve(model, args.host, args.port, args.batch_window_ms))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import os
+
+from data_processing import dataset_loading
+from data_processing import preprocesing
+from extrapolation_method.model import PolynomialExtrapolationModel
+
+
+def _forecast_columns(column):
+    # Для прогнозу потрібні лише назви регіонів та стовпці населення
+    return column == 'Country/Territory' or str(column).endswith(' Population')
+
+
+def stream_forecasts(source, x_future=2025, degree=2, calculate_error=False, chunksize=100_000, method='polynomial'):
+    """
+    Forecasts a large CSV source chunk by chunk with bounded memory.
+
+    Only the region name and '<year> Population' columns are read. Each chunk is
+    preprocessed in place and fitted independently.
+
+    Args:
+        source (str): Path to the CSV file.
+        x_future (int): Year to forecast.
+        degree (int): Polynomial degree.
+        calculate_error (bool): Add the error columns when x_future is between the first and last known year.
+        chunksize (int): Rows per chunk.
+        method (str): Name of a registered extrapolation method.
+
+    Yields:
+        pd.DataFrame: Results with the same schema as PolynomialExtrapolationModel.model().
+    """
+    for chunk in dataset_loading.iter_dataset_chunks(source, chunksize=chunksize, usecols=_forecast_columns):
+        chunk = preprocesing.process_data(chunk, inplace=True)
+        model = PolynomialExtrapolationModel(chunk, x_future=x_future, degree=degree, method=method)
+        yield model.model(calculate_error=calculate_error)
+
+
+def write_forecasts(source, destination, x_future=2025, degree=2, calculate_error=False, chunksize=100_000, method='polynomial'):
+    """
+    Streams forecasts for a CSV source into a CSV destination, appending chunk by chunk.
+
+    Returns:
+        int: Number of rows written.
+    """
+    rows = 0
+    tmp_path = destination + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        for results in stream_forecasts(source, x_future, degree, calculate_error, chunksize, method):
+            results.to_csv(f, header=(rows == 0), index=False)
+            rows += len(results)
+    os.replace(tmp_path, destination)
+    return rows
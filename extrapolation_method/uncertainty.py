@@ -0,0 +1,180 @@
+from concurrent.futures import ProcessPoolExecutor
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+from extrapolation_method import batch_fit
+
+INTERVAL_METHODS = ('analytic', 'bootstrap')
+# Обмеження розміру проміжного масиву бутстрепу (рядки x вибірки x роки) на один крок
+BOOTSTRAP_BLOCK_ELEMENTS = 4_000_000
+
+
+def t_quantile(p, df):
+    """
+    Quantile of Student's t distribution.
+
+    Uses scipy when it is installed; otherwise the exact formulas for df 1 and 2 and a
+    Cornish-Fisher expansion around the normal quantile (error under 1% for df >= 3).
+    """
+    try:
+        from scipy import stats
+    except ImportError:
+        stats = None
+    if stats is not None:
+        return float(stats.t.ppf(p, df))
+
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    return (z
+            + (z ** 3 + z) / (4 * df)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+
+def _design(years, x, degree):
+    # Роки центруються й масштабуються, щоб матриця Вандермонда була добре обумовленою
+    center = years.mean()
+    scale = max(np.ptp(years) / 2, 1.0)
+    design = np.vander((years - center) / scale, degree + 1)
+    target = np.vander((np.atleast_1d(x) - center) / scale, degree + 1)
+    return design, target
+
+
+def _group_fit(years, values, degree, x):
+    """
+    Least-squares fit of all rows in one valid-year group via a single QR decomposition.
+
+    Returns:
+        tuple: (estimate (rows, len(x)), residuals (rows, n), leverage_weights (len(x), n),
+        prediction_scale (len(x),)) where the forecast variance is s**2 * prediction_scale.
+    """
+    design, target = _design(years, x, degree)
+    q, r = np.linalg.qr(design)
+    # h = x0 (X'X)^-1 X' — ваги, з якими залишки входять у прогноз
+    solved = np.linalg.solve(r.T, target.T)
+    weights = (q @ solved).T
+    estimate = values @ weights.T
+    fitted = values @ q @ q.T
+    residuals = values - fitted
+    prediction_scale = 1 + np.sum(solved ** 2, axis=0)
+    return estimate, residuals, weights, prediction_scale
+
+
+def interval_chunk(years, populations, degree, x, level=0.95, method='analytic', n_boot=1000, seed=None):
+    """
+    Point forecasts and prediction intervals for a block of rows.
+
+    Rows are grouped by their valid-year pattern as in batch_fit.fit_polynomials; each
+    group is solved with one QR decomposition. 'analytic' uses the t-based interval from
+    the residual variance; 'bootstrap' resamples residuals, which stays linear in the
+    residuals, so every resample costs one matrix product instead of a refit.
+
+    Args:
+        years (list): Known years, one per matrix column.
+        populations (np.ndarray): Matrix of shape (rows, len(years)).
+        degree (int): Polynomial degree.
+        x (float or array-like): Target year(s).
+        level (float): Coverage of the interval, e.g. 0.95.
+        method (str): 'analytic' or 'bootstrap'.
+        n_boot (int): Number of bootstrap resamples.
+        seed (int): Seed for the bootstrap generator.
+
+    Returns:
+        tuple: (estimate, lower, upper), each of shape (rows,) for a scalar x, otherwise
+        (rows, len(x)). Rows with no spare degrees of freedom get NaN bounds.
+    """
+    if method not in INTERVAL_METHODS:
+        raise ValueError(f"Unknown interval method '{method}', expected one of {INTERVAL_METHODS}")
+
+    years = np.asarray(years, dtype=np.float64)
+    populations = np.asarray(populations, dtype=np.float64)
+    scalar = np.ndim(x) == 0
+    targets = np.atleast_1d(np.asarray(x, dtype=np.float64))
+    shape = (populations.shape[0], targets.size)
+    estimate = np.full(shape, np.nan)
+    lower = np.full(shape, np.nan)
+    upper = np.full(shape, np.nan)
+    alpha = (1 - level) / 2
+    rng = np.random.default_rng(seed)
+
+    for mask, rows in batch_fit.mask_groups(populations > 0):
+        n = int(mask.sum())
+        if n < degree + 1:
+            continue
+        values = populations[np.ix_(rows, mask)]
+        group_estimate, residuals, weights, prediction_scale = _group_fit(years[mask], values, degree, targets)
+        estimate[rows] = group_estimate
+        dof = n - degree - 1
+        if dof < 1:
+            continue
+
+        if method == 'analytic':
+            variance = np.sum(residuals ** 2, axis=1) / dof
+            half_width = t_quantile(1 - alpha, dof) * np.sqrt(variance[:, None] * prediction_scale[None, :])
+            lower[rows] = group_estimate - half_width
+            upper[rows] = group_estimate + half_width
+            continue
+
+        # Залишки масштабуються до незміщеної дисперсії перед повторною вибіркою
+        residuals = residuals * math.sqrt(n / dof)
+        block = max(1, BOOTSTRAP_BLOCK_ELEMENTS // (n_boot * n))
+        for start in range(0, len(rows), block):
+            part = residuals[start:start + block]
+            picks = rng.integers(0, n, size=(n_boot, n))
+            new_noise = part[:, rng.integers(0, n, size=n_boot)]
+            # (рядки, вибірки, роки) @ h -> відхилення прогнозу для кожної вибірки
+            deviations = part[:, picks] @ weights.T + new_noise[:, :, None]
+            low, high = np.quantile(deviations, [alpha, 1 - alpha], axis=1)
+            centre = group_estimate[start:start + block]
+            lower[rows[start:start + block]] = centre + low
+            upper[rows[start:start + block]] = centre + high
+
+    if scalar:
+        return estimate[:, 0], lower[:, 0], upper[:, 0]
+    return estimate, lower, upper
+
+
+def prediction_intervals(years, populations, degree, x, level=0.95, method='analytic', n_boot=1000,
+                         seed=None, workers=1, chunk_size=5000):
+    """
+    Prediction intervals for every row of a population matrix.
+
+    With workers other than 1 the rows are split into chunks of chunk_size and scored in
+    a process pool (mainly useful for the bootstrap); workers=None lets the executor choose.
+    Each chunk gets its own seed derived from seed, so results do not depend on scheduling.
+
+    Returns:
+        tuple: (estimate, lower, upper) as returned by interval_chunk.
+    """
+    if method == 'bootstrap' and n_boot < 1:
+        raise ValueError(f"The bootstrap needs at least one resample, got n_boot={n_boot}")
+    populations = np.asarray(populations, dtype=np.float64)
+    chunks = [populations[start:start + chunk_size] for start in range(0, populations.shape[0], chunk_size)]
+    seeds = np.random.SeedSequence(seed).generate_state(max(len(chunks), 1)).tolist()
+
+    if workers == 1 or len(chunks) <= 1:
+        parts = [interval_chunk(years, chunk, degree, x, level, method, n_boot, chunk_seed)
+                 for chunk, chunk_seed in zip(chunks, seeds)]
+    else:
+        count = len(chunks)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(
+                interval_chunk,
+                [years] * count,
+                chunks,
+                [degree] * count,
+                [x] * count,
+                [level] * count,
+                [method] * count,
+                [n_boot] * count,
+                seeds[:count]
+            ))
+
+    if not parts:
+        return interval_chunk(years, populations, degree, x, level, method, n_boot, seed)
+    return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
@@ -0,0 +1,311 @@
+"""
+Hot-path instrumentation for the model, batch runs and GUI callbacks.
+
+Enable with the WORLD_POP_INSTRUMENT environment variable, or at runtime with enable():
+    WORLD_POP_INSTRUMENT=1 python app.py              # spans, counters, histograms
+    WORLD_POP_INSTRUMENT=profile python app.py        # ... plus cProfile capture per run
+    WORLD_POP_INSTRUMENT_DUMP=timings.json python -m extrapolation_method --years 2030
+
+Spans (span() / @timed) feed per-stage duration histograms; a run (begin_run() /
+run()) collects the stages of one on_submit or batch invocation, from the blocks
+attached to it. snapshot() and
+dump() expose everything as JSON. When disabled, span() returns a shared no-op
+object and @timed adds a single flag check per call.
+"""
+import atexit
+import collections
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+_setting = os.environ.get('WORLD_POP_INSTRUMENT', '')
+_enabled = _setting not in ('', '0')
+_profiling = _setting.lower() == 'profile'
+_lock = threading.Lock()
+_counters = collections.Counter()
+_histograms = {}
+_runs = collections.deque(maxlen=100)
+# Запуск, до якого зараховуються спани поточного потоку (див. Run.attach)
+_local = threading.local()
+
+HISTOGRAM_SAMPLES = 2048
+PROFILE_TOP_FUNCTIONS = 25
+
+
+class Histogram:
+    """Count, total and extremes of all observations plus a window of recent ones for percentiles."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=HISTOGRAM_SAMPLES)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, q):
+        values = sorted(self.recent)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+def enabled():
+    return _enabled
+
+
+def profiling():
+    return _enabled and _profiling
+
+
+def enable(profile=False):
+    global _enabled, _profiling
+    _enabled = True
+    _profiling = profile
+
+
+def disable():
+    global _enabled, _profiling
+    _enabled = False
+    _profiling = False
+
+
+def reset():
+    """Drops all collected counters, histograms and runs."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _runs.clear()
+
+
+def observe(name, value):
+    """Adds a value (for timings, milliseconds) to the histogram name."""
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(value)
+        run = getattr(_local, 'run', None)
+        if run is not None:
+            run.stages[name] += value
+
+
+def count(name, value=1):
+    if _enabled:
+        with _lock:
+            _counters[name] += value
+
+
+class _Span:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, (time.perf_counter() - self.started) * 1000)
+        if exc_type is not None:
+            count(f'{self.name}.errors')
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Context manager timing a named stage (milliseconds)."""
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def timed(name=None):
+    """Decorator form of span(); the stage name defaults to module.qualname."""
+    def decorator(func):
+        stage = name or f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Run:
+    """
+    Stage timings of one on_submit or batch invocation.
+
+    Spans are summed per stage only inside attach() blocks, in the thread that entered
+    them, so a job still running for a superseded run never adds to a newer one. A run
+    that hops threads (worker then Tk main loop) wraps each part in attach(); with
+    profiling on, each part also captures cProfile data.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.stages = collections.defaultdict(float)
+        self.profiles = []
+
+    @contextlib.contextmanager
+    def attach(self):
+        previous = getattr(_local, 'run', None)
+        _local.run = self
+        profiler = None
+        if _enabled and _profiling:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.profiles.append(profiler)
+            _local.run = previous
+
+    def _profile_summary(self):
+        if not self.profiles:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiles[0], stream=stream)
+        for profiler in self.profiles[1:]:
+            stats.add(profiler)
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        return stream.getvalue()
+
+
+class _NullRun:
+    name = None
+
+    def attach(self):
+        return _NULL_SPAN
+
+
+_NULL_RUN = _NullRun()
+
+
+def begin_run(name):
+    """Starts a run; stages are collected inside its attach() blocks. No-op run when disabled."""
+    if not _enabled:
+        return _NULL_RUN
+    return Run(name)
+
+
+def end_run(run):
+    """Finishes a run started with begin_run and keeps its record for snapshot()."""
+    if run is _NULL_RUN:
+        return
+    total = (time.perf_counter() - run.started) * 1000
+    record = {
+        'name': run.name,
+        'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'total_ms': total,
+        'stages_ms': dict(run.stages),
+    }
+    profile = run._profile_summary()
+    if profile:
+        record['profile'] = profile
+    with _lock:
+        _runs.append(record)
+    observe(f'run.{run.name}', total)
+
+
+def discard_run(run):
+    """Drops a run that will never finish (e.g. a superseded GUI job); only counted."""
+    if run is not _NULL_RUN:
+        count(f'run.{run.name}.superseded')
+
+
+@contextlib.contextmanager
+def run(name):
+    """begin_run/end_run around a block running in one thread, profiled when enabled."""
+    current = begin_run(name)
+    try:
+        with current.attach():
+            yield current
+    finally:
+        end_run(current)
+
+
+def snapshot():
+    with _lock:
+        return {
+            'enabled': _enabled,
+            'profiling': _enabled and _profiling,
+            'counters': dict(_counters),
+            'histograms_ms': {name: histogram.to_dict() for name, histogram in sorted(_histograms.items())},
+            'runs': list(_runs),
+        }
+
+
+def dump(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f, indent=2, ensure_ascii=False)
+
+
+def format_summary(last_runs=5):
+    """Plain-text table of the histograms and the most recent runs (for the GUI panel)."""
+    data = snapshot()
+    if not data['enabled'] and not data['histograms_ms']:
+        return "Інструментування вимкнено.\n"
+
+    lines = [f"{'Етап':<44}{'N':>7}{'сер., мс':>11}{'p50':>10}{'p90':>10}{'p99':>10}{'макс.':>10}"]
+    for name, h in data['histograms_ms'].items():
+        lines.append(f"{name:<44}{h['count']:>7}{h['mean']:>11.2f}{h['p50']:>10.2f}{h['p90']:>10.2f}{h['p99']:>10.2f}{h['max']:>10.2f}")
+    if data['counters']:
+        lines.append("")
+        lines.extend(f"{name}: {value}" for name, value in sorted(data['counters'].items()))
+    for record in data['runs'][-last_runs:]:
+        lines.append("")
+        lines.append(f"{record['finished']} {record['name']}: {record['total_ms']:.1f} мс")
+        for stage, ms in sorted(record['stages_ms'].items(), key=lambda item: -item[1]):
+            lines.append(f"    {stage:<40}{ms:>10.2f} мс")
+    return "\n".join(lines) + "\n"
+
+
+_dump_path = os.environ.get('WORLD_POP_INSTRUMENT_DUMP')
+if _dump_path:
+    if not _enabled:
+        enable()
+    atexit.register(dump, _dump_path)
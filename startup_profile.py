@@ -0,0 +1,108 @@
+"""
+Startup instrumentation for the GUI.
+
+Enable with the WORLD_POP_STARTUP_PROFILE environment variable:
+    WORLD_POP_STARTUP_PROFILE=1 python app.py            # report to stderr
+    WORLD_POP_STARTUP_PROFILE=startup.json python app.py  # report to a JSON file
+
+Records per-import timings (first import of every module, inclusive of its own
+imports) and named startup phases, measured from the moment start() is called.
+When disabled every function here is a no-op.
+"""
+import builtins
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+_setting = os.environ.get('WORLD_POP_STARTUP_PROFILE', '')
+_enabled = _setting not in ('', '0')
+_origin = time.perf_counter()
+_phases = []
+_imports = []
+_original_import = builtins.__import__
+_local = threading.local()
+_reported = False
+
+
+def enabled():
+    return _enabled
+
+
+def start():
+    """Resets the clock and starts timing imports; call it before the heavy imports."""
+    global _origin
+    if not _enabled or builtins.__import__ is _timed_import:
+        return
+    _origin = time.perf_counter()
+    builtins.__import__ = _timed_import
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _local.depth = depth
+        _imports.append({
+            'module': name,
+            'depth': depth,
+            'thread': threading.current_thread().name,
+            'start_s': started - _origin,
+            'duration_s': time.perf_counter() - started,
+        })
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Times a named startup phase (e.g. 'window shown', 'dataset loaded')."""
+    if not _enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append({
+            'phase': name,
+            'thread': threading.current_thread().name,
+            'start_s': started - _origin,
+            'duration_s': time.perf_counter() - started,
+        })
+
+
+def mark(name):
+    """Records a point in time, such as the first paint of the window."""
+    if _enabled:
+        _phases.append({'phase': name, 'thread': threading.current_thread().name, 'start_s': time.perf_counter() - _origin, 'duration_s': 0.0})
+
+
+def report():
+    """Writes the collected timings once and stops the import hook."""
+    global _reported
+    if not _enabled or _reported:
+        return
+    _reported = True
+    builtins.__import__ = _original_import
+
+    if _setting != '1' and _setting.lower() not in ('true', 'stderr'):
+        with open(_setting, 'w', encoding='utf-8') as f:
+            json.dump({'phases': _phases, 'imports': _imports}, f, indent=2)
+        print(f"Startup profile written to {_setting}", file=sys.stderr)
+        return
+
+    print("\n=== Startup phases ===", file=sys.stderr)
+    for entry in sorted(_phases, key=lambda e: e['start_s']):
+        print(f"{entry['start_s'] * 1e3:9.1f} ms  +{entry['duration_s'] * 1e3:8.1f} ms  {entry['phase']} [{entry['thread']}]", file=sys.stderr)
+
+    print("\n=== Slowest top-level imports ===", file=sys.stderr)
+    top_level = [entry for entry in _imports if entry['depth'] == 0]
+    for entry in sorted(top_level, key=lambda e: e['duration_s'], reverse=True)[:15]:
+        print(f"{entry['duration_s'] * 1e3:9.1f} ms  {entry['module']} [{entry['thread']}]", file=sys.stderr)